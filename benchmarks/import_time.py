@@ -0,0 +1,31 @@
+# Measures the cold start cost of pyHAPCAN for short-lived tools, every scenario runs in a fresh interpreter
+# Usage: python benchmarks/import_time.py [repeats]
+
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "import pyHAPCAN": "import pyHAPCAN",
+    "decode one frame": "from pyHAPCAN import HapcanMessage; HapcanMessage.from_bytes(bytes.fromhex('aa10e1010261626300000000001aa5'))",
+    "emulator with serial interface": "from pyHAPCAN import HapcanEmulator, HapcanDeviceSerialInterface",
+}
+
+
+def measure(statement, repeats):
+    # Best wall time of the statement in a fresh interpreter, interpreter startup itself excluded
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        times.append(float(out.stdout))
+    return min(times)
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for name, statement in SCENARIOS.items():
+        print(f"{name:32s} {measure(statement, repeats) * 1000:7.2f} ms")
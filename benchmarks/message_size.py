@@ -0,0 +1,54 @@
+# Measures the memory held per decoded message, which dominates when captures of millions of frames are kept
+# Usage: python benchmarks/message_size.py [count] [root], root is another checkout to compare with, e.g. one before __slots__
+
+import os
+import sys
+import tracemalloc
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FRAME = bytes.fromhex("aa10e1010261626300000000001aa5")
+
+
+def frames(count):
+    # Distinct frames of one message type, the sender and data bytes vary and the checksum is kept valid
+    out = []
+    for i in range(count):
+        frame = bytearray(FRAME)
+        frame[3], frame[4], frame[5] = i % 256, i // 256 % 256, 0x61 + i % 26
+        frame[-2] = sum(frame[1:-2]) & 0xFF
+        out.append(bytes(frame))
+    return out
+
+
+def measure(decode, data):
+    # Bytes allocated per message while all messages are held, the frames themselves are allocated beforehand
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    messages = [decode(frame) for frame in data]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return size / len(messages), messages[0]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    root = sys.argv[2] if len(sys.argv) > 2 else ROOT
+    sys.path.insert(0, root)
+    from pyHAPCAN import HapcanMessage
+
+    data = frames(count)
+    HapcanMessage.from_bytes(data[0]) # Message classes are loaded before measuring
+    scenarios = {"from_bytes": HapcanMessage.from_bytes}
+    try:
+        HapcanMessage.from_bytes(data[0], lazy=True)
+        scenarios["from_bytes lazy"] = lambda frame: HapcanMessage.from_bytes(frame, lazy=True)
+    except TypeError:
+        pass # Checkout without lazy decoding
+
+    print(f"{root}, {count} messages of {type(HapcanMessage.from_bytes(data[0])).__name__}")
+    for name, decode in scenarios.items():
+        size, message = measure(decode, data)
+        kind = "__dict__" if hasattr(message, "__dict__") else "__slots__"
+        print(f"{name:16s} {size:7.1f} bytes/message  ({kind}, sys.getsizeof {sys.getsizeof(message)})")
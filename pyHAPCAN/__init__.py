@@ -1,9 +1,63 @@
-from .hapcanEmulator import *
+# Submodules are imported on first access to one of their names (PEP 562), so a tool only decoding captures
+# neither pays for nor needs the emulator, the devices and pyserial.
+# Message classes are loaded and registered together the first time one of them or the classifier is needed.
+import importlib
 
-from .hapcanMessage import *
-from .hapcanMessagesUART_Programming import *
-from .hapcanMessagesUART_System import *
-from .hapcanMessages_Programming import *
-from .hapcanMessages_System import *
 
-from .devices.hapcanDeviceSerialInterface import * #TODO Make individual devices as HapcanDevice properties, just as done with HapcanMessages???
\ No newline at end of file
+# Public name -> submodule defining it
+_LAZY_NAMES = {
+    "HapcanEmulator": ".hapcanEmulator",
+    "HapcanDevice": ".hapcanDevice",
+    "HapcanMessage": ".hapcanMessage",
+    "HapcanMessageUART": ".hapcanMessage",
+    "HapcanMessageType": ".hapcanMessage",
+    "HapcanMessageCache": ".hapcanMessage",
+    "HapcanDeviceSerialInterface": ".devices.hapcanDeviceSerialInterface", #TODO Make individual devices as HapcanDevice properties, just as done with HapcanMessages???
+}
+
+# Names needing numpy, accessible like the others but left out of star imports, which work with only pyserial
+_OPTIONAL_NAMES = {
+    "DeviceFleet": ".hapcanFleet",
+    "HapcanTopology": ".hapcanTopology",
+}
+
+_SUBMODULES = {
+    "devices",
+    "hapcanBatch",
+    "hapcanDevice",
+    "hapcanEmulator",
+    "hapcanFleet",
+    "hapcanMemory",
+    "hapcanMessage",
+    "hapcanMessagesUART_Programming",
+    "hapcanMessagesUART_System",
+    "hapcanMessages_Programming",
+    "hapcanMessages_System",
+    "hapcanTopology",
+}
+
+
+def __getattr__(name):
+    if name == "__all__":
+        # Built on the first star import, which like before exports the message classes and therefore loads them
+        messages = {key for module in _SUBMODULES if module.startswith("hapcanMessages")
+                    for key, item in vars(importlib.import_module("." + module, __name__)).items()
+                    if getattr(item, "FRAME_TYPE", None) is not None}
+        value = list(_LAZY_NAMES) + sorted(messages)
+    elif name in _LAZY_NAMES or name in _OPTIONAL_NAMES:
+        value = getattr(importlib.import_module(_LAZY_NAMES.get(name) or _OPTIONAL_NAMES[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        # Message classes, the CAN ones shadow UART ones of the same name
+        from .hapcanMessage import HapcanMessage, HapcanMessageUART
+        value = getattr(HapcanMessage, name, None) or getattr(HapcanMessageUART, name, None)
+        if not isinstance(value, type) or value.FRAME_TYPE is None:
+            raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    globals()[name] = value # Resolved once, later lookups do not reach __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_OPTIONAL_NAMES) | _SUBMODULES)
@@ -1,9 +1,9 @@
-from copy import copy
+import asyncio
 import serial
 import time
 
-from ..hapcanMessage import HapcanMessage, HapcanMessageUART
-from ..hapcanDevice import HapcanDevice
+from ..hapcanMessage import HapcanMessage, HapcanMessageUART, HapcanMessageCache
+from ..hapcanDevice import HapcanDevice, handles
 
 
 def micros():
@@ -12,15 +12,23 @@ def micros():
 
 class HapcanDeviceSerialInterface(HapcanDevice):
 
-    def __init__(self, serial:serial.Serial, *args, **kwargs):
+    SNAPSHOT_ATTRIBUTES = HapcanDevice.SNAPSHOT_ATTRIBUTES + ("_rxBuffer",)
+
+    def __init__(self, serial:serial.Serial, *args, messageCache:HapcanMessageCache=None, **kwargs):
         super().__init__(*args, aType=101, bootVer=3, bootRev=4, aVers=0, fVers=1, **kwargs)
         self.serial = serial
+        self.messageCache = messageCache # Optional, decodes each distinct received frame only once
         self._rxBuffer = bytearray()
         self._last_serial_rx_time = 0
+        self._frameEndTimer = None # Frame end timeout while run() waits for serial input
+        self._serialFd = None # File descriptor watched by run(), None while polled
+        self._pollTimer = None # Timer polling process() in run() for ports without file descriptor
 
 
     def process(self):
-        buf = self.serial.read_all() # Read all available bytes from Serial
+        buf = self._readSerial() # Read all available bytes from Serial
+        if buf is None:
+            return
 
         if buf:
             for b in buf:
@@ -33,6 +41,58 @@ class HapcanDeviceSerialInterface(HapcanDevice):
 
 
 
+    async def run(self):
+        # Woken by serial input through the file descriptor (POSIX serial ports, socket:// URLs) instead of polling,
+        # ports without one (Windows) are polled by process()
+        loop = asyncio.get_running_loop()
+        try:
+            self._serialFd = self.serial.fileno()
+            loop.add_reader(self._serialFd, self._onSerialReadable)
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            self._serialFd = None
+            self._pollTimer = self.schedule(self._emulator.POLL_INTERVAL, interval=self._emulator.POLL_INTERVAL)
+        try:
+            await loop.create_future() # Until the emulator stops
+        finally:
+            self._stopReading()
+            if self._frameEndTimer is not None:
+                self._frameEndTimer.cancel()
+
+
+    def _onSerialReadable(self):
+        buf = self._readSerial()
+        if buf is None:
+            return
+        for b in buf:
+            self._processSerialRxByte(b)
+        # Frame end after 100 us without further input
+        if self._frameEndTimer is not None:
+            self._frameEndTimer.cancel()
+        self._frameEndTimer = self.schedule(0.0001, self._processSerialRxByte, None)
+
+
+    def _readSerial(self):
+        # Returns None once the port failed, e.g. the adapter was unplugged, reading stops and the running emulator
+        # fails with the error, which is raised directly when process() is called outside of it
+        try:
+            return self.serial.read_all()
+        except (serial.SerialException, OSError) as e:
+            self._stopReading()
+            if self._emulator._loop is None:
+                raise
+            self._emulator._fail(e)
+            return None
+
+
+    def _stopReading(self):
+        if self._serialFd is not None:
+            asyncio.get_running_loop().remove_reader(self._serialFd)
+            self._serialFd = None
+        if self._pollTimer is not None:
+            self._pollTimer.cancel()
+            self._pollTimer = None
+
+
     def _processSerialRxByte(self, b:int):
         # If b is None, it indicates a timeout for frame end
         if b is None:
@@ -50,89 +110,99 @@ class HapcanDeviceSerialInterface(HapcanDevice):
 
 
     def _processSerialRxFrame(self, frame):
-        # Check frame length to determine if it's a CAN message to be forwarded to the HAPCAN network
-        if len(frame) == HapcanMessage.FRAME_LENGTH:
-            try:
-                f = HapcanMessage.from_bytes(frame)
-                f._sender = self
-                if not f.checksumValid:
-                    return False
-            except ValueError as e:
-                print(e)
-                return False
-            self._emulator.broadcastCanMessage(f)
-            return True
-        
-
-        # Other frame lengths should be handled as UART system messages
+        # The classifier tells CAN messages to be forwarded to the HAPCAN network from UART system messages
+        # Decode lazily, most CAN messages are only forwarded and never have their fields read
         try:
-            f = HapcanMessageUART.from_bytes(frame)
+            if self.messageCache is not None:
+                f = self.messageCache.from_bytes(frame)
+            else:
+                f = HapcanMessage.from_bytes(frame, lazy=True)
         except ValueError as e:
             # Should not happen, as we already checked the frame start and end
-            # Unknown frame types should generate a generic HapcanMessageUART
+            # Unknown frame types should generate a generic HapcanMessage or HapcanMessageUART
             print(e)
-            return
+            return False
 
-        ## Process programming messages
-        if f.FRAME_TYPE == HapcanMessageUART.EXIT_ONE_BOOTLOADER.FRAME_TYPE:
-            return
-        
-        elif f.FRAME_TYPE == HapcanMessageUART.ADDRESS_FRAME.FRAME_TYPE:
-            self._mem_addr = f.addr
-            self._mem_cmd = f.cmd
-            resp = f.makeResponse()
-            self._sendSerialMessage(resp)
-            return
-        
-        elif f.FRAME_TYPE == HapcanMessageUART.DATA_FRAME.FRAME_TYPE:
-            mem = self._get_memory_by_address(self._mem_addr)
-
-            if self._mem_cmd == mem.OPERATION.READ:
-                dataBytes = mem.read(self._mem_addr, 8)
-                resp = HapcanMessageUART.DATA_FRAME_RESP(dataBytes=dataBytes)
-
-            elif self._mem_cmd == mem.OPERATION.WRITE:
-                # Need to prepare response before writing to memrory, in case the nodeId/groupId changes
-                resp = HapcanMessageUART.DATA_FRAME_RESP(dataBytes=bytearray(8*[0]))
-                mem.write(self._mem_addr, f.dataBytes)
-                dataBytes = mem.read(self._mem_addr, 8)
-                resp.dataBytes = dataBytes
-                
-            elif self._mem_cmd == mem.OPERATION.ERASE:
-                mem.erase_page(self._mem_addr)
-                dataBytes = mem.read(self._mem_addr, 8)
-                resp = HapcanMessageUART.DATA_FRAME_RESP(dataBytes=dataBytes)
-
-            self._sendSerialMessage(resp)
-            return
+        if not isinstance(f, HapcanMessageUART):
+            if not f.checksumValid:
+                return False
+            self._emulator.broadcastCanMessage(f, self) # f may be shared by the cache, it is not modified
+            return True
 
+        # UART system and programming messages are answered by the serial interface itself
+        handler = self._messageHandlers.get(type(f))
+        if handler is not None:
+            handler(self, f)
 
-        # Process system messages
-        elif f.FRAME_TYPE == HapcanMessageUART.ENTER_PROG_MODE_REQ.FRAME_TYPE:
-            self._sendSerialMessage(HapcanMessageUART.ENTER_PROG_MODE_REQ_RESP(bootVer=self.bootVer, bootRev=self.bootRev))
-            return
-        
-        elif f.FRAME_TYPE == HapcanMessageUART.REBOOT_REQ_NODE.FRAME_TYPE:
-            return
-        
-        elif f.FRAME_TYPE == HapcanMessageUART.HW_TYPE_REQ_NODE.FRAME_TYPE:
-            self._sendSerialMessage(HapcanMessageUART.HW_TYPE_REQ_NODE_RESP(hard=self.hard, hVer=self.hVer, serialNumber=self.serialNumber))
-            return
 
-        elif f.FRAME_TYPE == HapcanMessageUART.FW_TYPE_REQ_NODE.FRAME_TYPE:
-            self._sendSerialMessage(HapcanMessageUART.FW_TYPE_REQ_NODE_RESP(hard=self.hard, hVer=self.hVer, aType=self.aType, aVers=self.aVers, fVers=self.fVers, bootVer=self.bootVer, bootRev=self.bootRev))
-            return
-        
-        elif f.FRAME_TYPE == HapcanMessageUART.SUPPLY_VOLT_REQ_NODE.FRAME_TYPE:
-            self._sendSerialMessage(HapcanMessageUART.SUPPLY_VOLT_REQ_NODE_RESP(rawVBus=self.rawVBus, rawVCpu=self.rawVCpu))
-            return
+    ## Process programming messages
+    @handles(HapcanMessageUART.EXIT_ONE_BOOTLOADER)
+    def _onUartExitBootloader(self, f):
+        pass
 
-        elif f.FRAME_TYPE == HapcanMessageUART.DESC_REQ_NODE.FRAME_TYPE:
-            desc0 = self.description[0:8]
-            desc1 = self.description[8:16]
-            self._sendSerialMessage(HapcanMessageUART.DESC_REQ_NODE_RESP(desc0))
-            self._sendSerialMessage(HapcanMessageUART.DESC_REQ_NODE_RESP(desc1))
-            return
+
+    @handles(HapcanMessageUART.ADDRESS_FRAME)
+    def _onUartAddressFrame(self, f):
+        self._mem_addr = f.addr
+        self._mem_cmd = f.cmd
+        resp = f.makeResponse()
+        self._sendSerialMessage(resp)
+
+
+    @handles(HapcanMessageUART.DATA_FRAME)
+    def _onUartDataFrame(self, f):
+        mem = self._get_memory_by_address(self._mem_addr)
+
+        if self._mem_cmd == mem.OPERATION.READ:
+            dataBytes = mem.read(self._mem_addr, 8)
+            resp = HapcanMessageUART.DATA_FRAME_RESP(dataBytes=dataBytes)
+
+        elif self._mem_cmd == mem.OPERATION.WRITE:
+            # Need to prepare response before writing to memrory, in case the nodeId/groupId changes
+            resp = HapcanMessageUART.DATA_FRAME_RESP(dataBytes=bytearray(8*[0]))
+            mem.write(self._mem_addr, f.dataBytes)
+            dataBytes = mem.read(self._mem_addr, 8)
+            resp.dataBytes = dataBytes
+
+        elif self._mem_cmd == mem.OPERATION.ERASE:
+            mem.erase_page(self._mem_addr)
+            dataBytes = mem.read(self._mem_addr, 8)
+            resp = HapcanMessageUART.DATA_FRAME_RESP(dataBytes=dataBytes)
+
+        self._sendSerialMessage(resp)
+
+
+    # Process system messages
+    @handles(HapcanMessageUART.ENTER_PROG_MODE_REQ)
+    def _onUartEnterProgModeReq(self, f):
+        self._sendSerialMessage(HapcanMessageUART.ENTER_PROG_MODE_REQ_RESP(bootVer=self.bootVer, bootRev=self.bootRev))
+
+
+    @handles(HapcanMessageUART.REBOOT_REQ_NODE)
+    def _onUartRebootReqNode(self, f):
+        pass
+
+
+    @handles(HapcanMessageUART.HW_TYPE_REQ_NODE)
+    def _onUartHwTypeReqNode(self, f):
+        self._sendSerialMessage(HapcanMessageUART.HW_TYPE_REQ_NODE_RESP(hard=self.hard, hVer=self.hVer, serialNumber=self.serialNumber))
+
+
+    @handles(HapcanMessageUART.FW_TYPE_REQ_NODE)
+    def _onUartFwTypeReqNode(self, f):
+        self._sendSerialMessage(HapcanMessageUART.FW_TYPE_REQ_NODE_RESP(hard=self.hard, hVer=self.hVer, aType=self.aType, aVers=self.aVers, fVers=self.fVers, bootVer=self.bootVer, bootRev=self.bootRev))
+
+
+    @handles(HapcanMessageUART.SUPPLY_VOLT_REQ_NODE)
+    def _onUartSupplyVoltReqNode(self, f):
+        self._sendSerialMessage(HapcanMessageUART.SUPPLY_VOLT_REQ_NODE_RESP(rawVBus=self.rawVBus, rawVCpu=self.rawVCpu))
+
+
+    @handles(HapcanMessageUART.DESC_REQ_NODE)
+    def _onUartDescReqNode(self, f):
+        desc0 = self.description[0:8]
+        desc1 = self.description[8:16]
+        self._sendSerialMessages(HapcanMessageUART.DESC_REQ_NODE_RESP(desc0), HapcanMessageUART.DESC_REQ_NODE_RESP(desc1))
 
 
     def _sendSerialMessage(self, message:HapcanMessage):
@@ -140,6 +210,11 @@ class HapcanDeviceSerialInterface(HapcanDevice):
         self.serial.write(m)
 
 
+    def _sendSerialMessages(self, *messages:HapcanMessage):
+        # Encode all frames into one buffer and send them with a single write
+        self.serial.write(HapcanMessage.encode_all(messages))
+
+
     def processCanApplicationMessage(self, m):
         # Resend every CAN message to the serial interface
         self._sendSerialMessage(m)
\ No newline at end of file
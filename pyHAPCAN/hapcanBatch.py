@@ -0,0 +1,120 @@
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("Batch processing of HAPCAN frames requires numpy, install it with 'pip install numpy'") from e
+
+from .hapcanMessage import HapcanMessage
+
+
+
+# Columnar view of a contiguous buffer of CAN frames, created by HapcanMessage.decode_many()
+class HapcanFrameBatch:
+
+    def __init__(self, buffer):
+        frameLength = HapcanMessage.FRAME_LENGTH
+        data = np.frombuffer(buffer, dtype=np.uint8) # Zero-copy, the buffer must not be modified while the batch is in use
+        if data.size % frameLength:
+            raise ValueError(f"Buffer length {data.size} is not a multiple of the {frameLength} bytes long CAN frame")
+        self.frames = data.reshape(-1, frameLength)
+
+        # Columns, one row per frame
+        self.frameType = self.frames[:, 1].astype(np.uint16) << 8 | self.frames[:, 2]
+        self.senderNode = self.frames[:, 3]
+        self.senderGroup = self.frames[:, 4]
+        self.data = self.frames[:, 5:13]
+        self.checksum = self.frames[:, 13]
+
+        # Validation of all frames at once
+        self.frameValid = (self.frames[:, 0] == 0xAA) & (self.frames[:, -1] == 0xA5)
+        self.checksumValid = self.frames[:, 1:13].sum(axis=1, dtype=np.uint16).astype(np.uint8) == self.checksum
+
+
+    def __len__(self):
+        return len(self.frames)
+
+
+    def __getitem__(self, index):
+        # Materialise the registered message class of a single row on request
+        return HapcanMessage.from_bytes(self.frames[index].tobytes())
+
+
+    def valid(self):
+        # Indexes of the frames with correct header, trailer and checksum
+        return np.flatnonzero(self.frameValid & self.checksumValid)
+
+
+
+# Frames found in an unaligned byte stream by scan_frames()
+class HapcanFrameScan:
+
+    def __init__(self, data, offsets, lengths, badChecksum, gaps):
+        self._data = data
+        self.offsets = offsets # Start of every valid frame
+        self.lengths = lengths # Length of every valid frame
+        self.badChecksum = badChecksum # Start of frames with correct header and trailer but wrong checksum
+        self.gaps = gaps # (start, end) of every region not covered by a valid frame
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+    def batch(self) -> HapcanFrameBatch:
+        # Gather the valid CAN frames into a contiguous HapcanFrameBatch
+        frameLength = HapcanMessage.FRAME_LENGTH
+        offsets = self.offsets[self.lengths == frameLength]
+        return HapcanFrameBatch(self._data[offsets[:, None] + np.arange(frameLength)].reshape(-1))
+
+
+def scan_frames(buffer, frameLengths=(HapcanMessage.FRAME_LENGTH,), chunkSize=1 << 24) -> HapcanFrameScan:
+    """
+    Find the frames in a serial dump or capture file in one vectorized pass, resynchronising after corrupt data.
+    Every 0xAA ... 0xA5 span of one of frameLengths is checked for its checksum, overlapping frames are resolved
+    first come first served. The buffer is searched chunkSize bytes at a time to bound the temporary arrays.
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    size = data.size
+    offsets, lengths, bad = [], [], []
+
+    for start in range(0, size, chunkSize):
+        headers = np.flatnonzero(data[start:start + chunkSize] == 0xAA) + start
+        for length in frameLengths:
+            candidates = headers[headers + length <= size]
+            candidates = candidates[data[candidates + length - 1] == 0xA5]
+            payload = data[candidates[:, None] + np.arange(1, length - 2)]
+            ok = payload.sum(axis=1, dtype=np.uint64).astype(np.uint8) == data[candidates + length - 2]
+            offsets.append(candidates[ok])
+            lengths.append(np.full(np.count_nonzero(ok), length, dtype=np.int64))
+            bad.append(candidates[~ok])
+
+    offsets = np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64)
+    lengths = np.concatenate(lengths) if lengths else np.empty(0, dtype=np.int64)
+    order = np.lexsort((-lengths, offsets)) # Prefer the longer frame when two start at the same offset
+    offsets, lengths = offsets[order], lengths[order]
+    ends = offsets + lengths
+
+    # Drop frames overlapping an earlier accepted frame, only frames starting before the end of some earlier
+    # frame can be affected, which in a healthy stream are the rare false frames found inside real ones
+    keep = np.ones(len(offsets), dtype=bool)
+    if len(offsets) > 1:
+        previousEnd = np.maximum.accumulate(ends)[:-1]
+        for k in np.flatnonzero(offsets[1:] < previousEnd) + 1:
+            j = k - 1
+            while j >= 0 and not keep[j]:
+                j -= 1
+            if j >= 0 and offsets[k] < ends[j]:
+                keep[k] = False
+    offsets, lengths, ends = offsets[keep], lengths[keep], ends[keep]
+
+    # Checksum failures inside valid frames are just payload bytes looking like a frame
+    bad = np.unique(np.concatenate(bad)) if bad else np.empty(0, dtype=np.int64)
+    if len(offsets):
+        inside = np.searchsorted(offsets, bad, side="right") - 1
+        bad = bad[(inside < 0) | (bad >= ends[inside.clip(0)])]
+
+    # Regions between the valid frames
+    starts = np.concatenate(([0], ends))
+    stops = np.concatenate((offsets, [size]))
+    gaps = np.stack((starts, stops), axis=1)[stops > starts]
+
+    return HapcanFrameScan(data, offsets, lengths, bad, gaps)
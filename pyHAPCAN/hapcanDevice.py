@@ -1,8 +1,53 @@
+from copy import copy
+
 from .hapcanMessage import HapcanMessage
-from .hapcanMemory import Memory, FlashMemory, MemoryField
+from .hapcanMemory import Memory, FlashMemory, MemoryField, MemoryImage, MemoryMap, MemoryRegion
+
+
+def handles(*messageClasses):
+    """
+    Mark a device method as the handler of the given message classes.
+    The handler tables are resolved by method name once per device class, so a subclass overrides a handler
+    by redefining the method and extends the table by decorating new methods.
+    """
+    def decorator(method):
+        method._handles = messageClasses
+        return method
+    return decorator
+
+
+class AcceptanceFilter:
+    """
+    Acceptance filter of a device, like a CAN mask/filter pair: a frame is accepted when the bits selected by
+    each mask equal those of the filter. Frame type, node and group are the frame bytes forming the HAPCAN CAN
+    identifier, i.e. FRAME_TYPE and the sender or target node and group. The default masks accept one frame type
+    from any node, frameType may also be given as a message class.
+    """
+
+    def __init__(self, frameType, frameTypeMask=0xFFFF, node=0x00, nodeMask=0x00, group=0x00, groupMask=0x00):
+        self.frameType = getattr(frameType, "FRAME_TYPE", frameType)
+        self.frameTypeMask = frameTypeMask
+        self.node = node
+        self.nodeMask = nodeMask
+        self.group = group
+        self.groupMask = groupMask
+
+    def matchesType(self, frameType):
+        return (frameType ^ self.frameType) & self.frameTypeMask == 0
+
+    def matchesAddress(self, node, group):
+        return (node ^ self.node) & self.nodeMask == 0 and (group ^ self.group) & self.groupMask == 0
+
 
 
 class HapcanDevice:
+
+    # Memories created for every device, application modules can add config or RAM regions
+    # e.g. MEMORY_REGIONS = HapcanDevice.MEMORY_REGIONS + (MemoryRegion("ram", base_address=0x800000, size=0x100),)
+    MEMORY_REGIONS = (
+        MemoryRegion("flash", base_address=0x000000, size=0x010000, memoryClass=FlashMemory, page_size=64), # 0x000000 - 0x00FFFF
+        MemoryRegion("eeprom", base_address=0xF00000, size=0x000400), # 0xF00000 - 0xF003FF
+    )
     
     # Prepare memory-mapped fields
     serialNumber   = MemoryField(address=0x000024, size=4)
@@ -19,10 +64,40 @@ class HapcanDevice:
     #rawVBus       # In real devices, these are immediately converted from ADC when requested
     #rawVCpu       # In real devices, these are immediately converted from ADC when requested
 
+    # Device registers captured by snapshot() besides the memories, subclasses extend it with their own state
+    SNAPSHOT_ATTRIBUTES = ("_mem_addr", "_mem_cmd", "rawVBus", "rawVCpu")
+
+    # Frames passed to processCanApplicationMessage(), None for all frames
+    # e.g. ACCEPTANCE_FILTERS = (AcceptanceFilter(0x3020, frameTypeMask=0xFFF0), AcceptanceFilter(0x3010, group=5, groupMask=0xFF))
+    # Requests addressed to the device are routed to it regardless of its filters
+    ACCEPTANCE_FILTERS = None
+
+    _messageHandlers = {} # Message class -> handler function, built by _build_handler_table()
+    _receivesAll = False # Devices overriding the message processing and declaring no filters get every message
+
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._build_handler_table()
+        cls._receivesAll = (cls.processCanApplicationMessage is not HapcanDevice.processCanApplicationMessage
+                            or cls.processCanMessage is not HapcanDevice.processCanMessage)
+
+
+    @classmethod
+    def _build_handler_table(cls):
+        # Base classes first, so handlers declared by subclasses win
+        names = {}
+        for k in reversed(cls.__mro__):
+            for name, value in k.__dict__.items():
+                for messageClass in getattr(value, "_handles", ()):
+                    names[messageClass] = name
+        cls._messageHandlers = {messageClass: getattr(cls, name) for messageClass, name in names.items()}
+
+
     def __init__(self, emulator, nodeId, groupId, serialNumber, aType,
                  hard=0x3000, hVer=0x03, aVers=0x00, fVers=0x00,
                  bootVer=0x00, bootRev=0x00, description="",
-                 rawVBus=0x0000, rawVCpu=0x0000):
+                 rawVBus=0x0000, rawVCpu=0x0000, memoryImage:MemoryImage=None):
         
         # List of field names that must fit in 0–255
         byte_fields = [
@@ -69,36 +144,93 @@ class HapcanDevice:
         if len(description) > 16:
             raise ValueError(f"description must be 16 characters or less, got {len(description)}")
         
+        newMemory = self._initState(emulator, memoryImage)
+
+        # Set initial values, memories loaded from an image keep the values programmed before
+        if newMemory:
+            self.serialNumber = serialNumber
+            self.hard = hard
+            self.hVer = hVer
+            self.aType = aType
+            self.aVers = aVers
+            self.fVers = fVers
+            self.bootVer = bootVer
+            self.bootRev = bootRev
+            self.nodeId = nodeId
+            self.groupId = groupId
+            self.description = description
+        self.rawVBus = rawVBus
+        self.rawVCpu = rawVCpu
+
+
+    def _initState(self, emulator, memoryImage=None):
+        # Everything but the initial values, also used by HapcanTopology to create validated devices in bulk
+        # Returns whether the memories are new, False if they were loaded from an existing image
         self._emulator = emulator
-        
-        # Initialize memories
-        self.eeprom = Memory(size=(0xF003FF - 0xF00000 + 1), base_address=0xF00000)  # 0xF00000 - 0xF003FF
-        self.flash = FlashMemory(size=(0x00FFFF - 0x000000 + 1), base_address=0x000000, page_size=64)  # 0x000000 - 0x00FFFF
+        self._acceptanceFilters = self.ACCEPTANCE_FILTERS # Replaced by setAcceptanceFilters()
+
+        # Initialize memories, each is also a device attribute named after its region (self.flash, self.eeprom)
+        # With a memory image the memories are stored in the next range of the image file, one region after another
+        newMemory = True
+        self._memoryImage = memoryImage
+        if memoryImage is not None:
+            image, newMemory = memoryImage.allocate(sum(region.size for region in self.MEMORY_REGIONS))
+        self.memory = MemoryMap()
+        offset = 0
+        for region in self.MEMORY_REGIONS:
+            mem = region.create(image[offset:offset+region.size] if memoryImage is not None else None)
+            offset += region.size
+            setattr(self, region.name, mem)
+            self.memory.add(mem)
+
+        # Follow address changes, by message, memory write or restore(), to keep the emulator routing current
+        for field in (type(self).nodeId, type(self).groupId):
+            getattr(self, field.region).watch(field.address, field.size, self._onAddressChanged)
 
         self._mem_cmd = Memory.OPERATION.READ
         self._mem_addr = 0
+        self._identityResponses = {} # Response class -> (device state, ready-made responses)
+        self._snapshot = None # Values of SNAPSHOT_ATTRIBUTES at the last snapshot()
+        return newMemory
 
-        # Set initial values
-        self.serialNumber = serialNumber
-        self.hard = hard
-        self.hVer = hVer
-        self.aType = aType
-        self.aVers = aVers
-        self.fVers = fVers
-        self.bootVer = bootVer
-        self.bootRev = bootRev
-        self.nodeId = nodeId
-        self.groupId = groupId
-        self.description = description
-        self.rawVBus = rawVBus
-        self.rawVCpu = rawVCpu
+
+    def snapshot(self):
+        # Restore point of the memories and registers, memory pages are only copied once they are modified
+        for mem in self.memory:
+            mem.snapshot()
+        self._snapshot = {name: copy(getattr(self, name)) for name in self.SNAPSHOT_ATTRIBUTES}
+
+
+    def restore(self):
+        # Return to the last snapshot(), the work done is proportional to the memory pages modified since
+        if self._snapshot is None:
+            raise RuntimeError(f"{self.__class__.__name__} has no snapshot to restore")
+        for mem in self.memory:
+            mem.restore()
+        for name, value in self._snapshot.items():
+            setattr(self, name, copy(value))
+
+
+    def close(self):
+        # Release the memories, e.g. before the memory image they are stored in is closed, see HapcanEmulator.close()
+        for mem in self.memory:
+            mem.release()
+
+
+    def setAcceptanceFilters(self, *filters:AcceptanceFilter):
+        # Replace the filters of this device, without arguments the device receives every frame again
+        self._acceptanceFilters = filters or None
+        if self._emulator is not None:
+            self._emulator._refreshRoute(self)
+
+
+    def _onAddressChanged(self):
+        if self._emulator is not None:
+            self._emulator._updateRoute(self)
 
 
     def _get_memory_by_address(self, addr):
-        for mem in [self.eeprom, self.flash]:
-            if mem.base_address <= addr < mem.base_address + len(mem.data):
-                return mem
-        raise ValueError(f"Address {hex(addr)} is outside memory ranges")
+        return self.memory.find(addr)
 
 
     def processCanApplicationMessage(self, m: HapcanMessage):
@@ -108,140 +240,169 @@ class HapcanDevice:
         
 
     def processCanMessage(self, m: HapcanMessage):
-        # Process programming messages
-        if m.FRAME_TYPE == HapcanMessage.EXIT_ALL_BOOTLOADER.FRAME_TYPE:
-            if m.isFor(self):
-                return
-        
-        elif m.FRAME_TYPE == HapcanMessage.EXIT_ONE_BOOTLOADER.FRAME_TYPE:
-            if m.isFor(self):
-                return
-        
-        elif m.FRAME_TYPE == HapcanMessage.ADDRESS_FRAME.FRAME_TYPE:
-            if m.isFor(self):
-                self._mem_addr = m.addr
-                self._mem_cmd = m.cmd
-                resp = m.makeResponse()
-                self.sendCanMessage(resp)
-                return
-
-        elif m.FRAME_TYPE == HapcanMessage.DATA_FRAME.FRAME_TYPE:
-            if m.isFor(self):
-                mem = self._get_memory_by_address(self._mem_addr)
-
-                if self._mem_cmd == mem.OPERATION.READ:
-                    dataBytes = mem.read(self._mem_addr, 8)
-                    resp = HapcanMessage.DATA_FRAME_RESP(targetNode=self.nodeId, targetGroup=self.groupId, dataBytes=dataBytes)
-
-                elif self._mem_cmd == mem.OPERATION.WRITE:
-                    # Need to prepare response before writing to memrory, in case the nodeId/groupId changes
-                    resp = HapcanMessage.DATA_FRAME_RESP(targetNode=self.nodeId, targetGroup=self.groupId, dataBytes=bytearray(8*[0]))
-                    mem.write(self._mem_addr, m.dataBytes)
-                    dataBytes = mem.read(self._mem_addr, 8)
-                    resp.dataBytes = dataBytes
-
-                elif self._mem_cmd == mem.OPERATION.ERASE:
-                    mem.erase_page(self._mem_addr)
-                    dataBytes = mem.read(self._mem_addr, 8)
-                    resp = HapcanMessage.DATA_FRAME_RESP(targetNode=self.nodeId, targetGroup=self.groupId, dataBytes=dataBytes)
-
-                self.sendCanMessage(resp)
-                return
-        
-
-        # Process system messages
-        elif m.FRAME_TYPE == HapcanMessage.ENTER_PROG_MODE_REQ.FRAME_TYPE:
-            if m.isFor(self):
-                resp = HapcanMessage.ENTER_PROG_MODE_REQ_RESP(senderNode=self.nodeId, senderGroup=self.groupId,
-                                                              bootVer=self.bootVer, bootRev=self.bootRev)
-                self.sendCanMessage(resp)
-                return
-
-        elif m.FRAME_TYPE == HapcanMessage.HW_TYPE_REQ_GROUP.FRAME_TYPE:
-            if m.isFor(self):
-                resp = HapcanMessage.HW_TYPE_REQ_GROUP_RESP(senderNode=self.nodeId, senderGroup=self.groupId,
-                                                            hard=self.hard, hVer=self.hVer, serialNumber=self.serialNumber)
-                self.sendCanMessage(resp)
-                return
-        
-        elif m.FRAME_TYPE == HapcanMessage.HW_TYPE_REQ_NODE.FRAME_TYPE:
-            if m.isFor(self):
-                resp = HapcanMessage.HW_TYPE_REQ_NODE_RESP(senderNode=self.nodeId, senderGroup=self.groupId,
-                                                           hard=self.hard, hVer=self.hVer, serialNumber=self.serialNumber)
-                self.sendCanMessage(resp)
-                return
-        
-        elif m.FRAME_TYPE == HapcanMessage.FW_TYPE_REQ_GROUP.FRAME_TYPE:
-            if m.isFor(self):
-                resp = HapcanMessage.FW_TYPE_REQ_GROUP_RESP(senderNode=self.nodeId, senderGroup=self.groupId,
-                                                           hard=self.hard, hVer=self.hVer, aType=self.aType,
-                                                           aVers=self.aVers, fVers=self.fVers,
-                                                           bootVer=self.bootVer, bootRev=self.bootRev)
-                self.sendCanMessage(resp)
-                return
-        
-        elif m.FRAME_TYPE == HapcanMessage.FW_TYPE_REQ_NODE.FRAME_TYPE:
-            if m.isFor(self):
-                resp = HapcanMessage.FW_TYPE_REQ_NODE_RESP(senderNode=self.nodeId, senderGroup=self.groupId,
-                                                           hard=self.hard, hVer=self.hVer, aType=self.aType,
-                                                           aVers=self.aVers, fVers=self.fVers,
-                                                           bootVer=self.bootVer, bootRev=self.bootRev)
-                self.sendCanMessage(resp)
-                return
-        
-        elif m.FRAME_TYPE == HapcanMessage.SET_DEFAULT_NODE_AND_GROUP_REQ.FRAME_TYPE:
-            if m.isFor(self):
-                # Set node and group to default values derived from serial number
-                self.nodeId = self.serialNumber>>8 & 0xFF
-                self.groupId = self.serialNumber & 0xFF
-                resp = HapcanMessage.SET_DEFAULT_NODE_AND_GROUP_REQ_RESP(newNodeId=self.nodeId, newGroupId=self.groupId)
-                self.sendCanMessage(resp)
-                return
-
-        elif m.FRAME_TYPE == HapcanMessage.SUPPLY_VOLT_REQ_GROUP.FRAME_TYPE:
-            if m.isFor(self):
-                resp = HapcanMessage.SUPPLY_VOLT_REQ_GROUP_RESP(senderNode=self.nodeId, senderGroup=self.groupId,
-                                                                rawVBus=self.rawVBus, rawVCpu=self.rawVCpu)
-                self.sendCanMessage(resp)
-                return
-
-        elif m.FRAME_TYPE == HapcanMessage.SUPPLY_VOLT_REQ_NODE.FRAME_TYPE:
-            if m.isFor(self):
-                resp = HapcanMessage.SUPPLY_VOLT_REQ_NODE_RESP(senderNode=self.nodeId, senderGroup=self.groupId,
-                                                               rawVBus=self.rawVBus, rawVCpu=self.rawVCpu)
-                self.sendCanMessage(resp)
-                return
-        
-        elif m.FRAME_TYPE == HapcanMessage.DESC_REQ_GROUP.FRAME_TYPE:
-            if m.isFor(self):
-                desc0 = self.description[0:8]
-                desc1 = self.description[8:16]
-                resp0 = HapcanMessage.DESC_REQ_GROUP_RESP(senderNode=self.nodeId, senderGroup=self.groupId, desc=desc0)
-                resp1 = HapcanMessage.DESC_REQ_GROUP_RESP(senderNode=self.nodeId, senderGroup=self.groupId, desc=desc1)
-                self.sendCanMessage(resp0)
-                self.sendCanMessage(resp1)
-                return
-        
-        elif m.FRAME_TYPE == HapcanMessage.DESC_REQ_NODE.FRAME_TYPE:
-            if m.isFor(self):
-                desc0 = self.description[0:8]
-                desc1 = self.description[8:16]
-                resp0 = HapcanMessage.DESC_REQ_NODE_RESP(senderNode=self.nodeId, senderGroup=self.groupId, desc=desc0)
-                resp1 = HapcanMessage.DESC_REQ_NODE_RESP(senderNode=self.nodeId, senderGroup=self.groupId, desc=desc1)
-                self.sendCanMessage(resp0)
-                self.sendCanMessage(resp1)
-                return
-        
-        
-        # Forward other messages to application message processing
+        # Single lookup in the handler table of the device class, messages without a handler
+        # or not addressed to this device are forwarded to application message processing
+        handler = self._messageHandlers.get(type(m))
+        if handler is not None and m.isFor(self):
+            handler(self, m)
+            return
         self.processCanApplicationMessage(m)
 
 
+    # Process programming messages
+    @handles(HapcanMessage.EXIT_ALL_BOOTLOADER, HapcanMessage.EXIT_ONE_BOOTLOADER)
+    def _onExitBootloader(self, m):
+        pass
+
+
+    @handles(HapcanMessage.ADDRESS_FRAME)
+    def _onAddressFrame(self, m):
+        self._mem_addr = m.addr
+        self._mem_cmd = m.cmd
+        resp = m.makeResponse()
+        self.sendCanMessage(resp)
+
+
+    @handles(HapcanMessage.DATA_FRAME)
+    def _onDataFrame(self, m):
+        mem = self._get_memory_by_address(self._mem_addr)
+
+        if self._mem_cmd == mem.OPERATION.READ:
+            dataBytes = mem.read(self._mem_addr, 8)
+            resp = HapcanMessage.DATA_FRAME_RESP(targetNode=self.nodeId, targetGroup=self.groupId, dataBytes=dataBytes)
+
+        elif self._mem_cmd == mem.OPERATION.WRITE:
+            # Need to prepare response before writing to memrory, in case the nodeId/groupId changes
+            resp = HapcanMessage.DATA_FRAME_RESP(targetNode=self.nodeId, targetGroup=self.groupId, dataBytes=bytearray(8*[0]))
+            mem.write(self._mem_addr, m.dataBytes)
+            dataBytes = mem.read(self._mem_addr, 8)
+            resp.dataBytes = dataBytes
+
+        elif self._mem_cmd == mem.OPERATION.ERASE:
+            mem.erase_page(self._mem_addr)
+            dataBytes = mem.read(self._mem_addr, 8)
+            resp = HapcanMessage.DATA_FRAME_RESP(targetNode=self.nodeId, targetGroup=self.groupId, dataBytes=dataBytes)
+
+        self.sendCanMessage(resp)
+
+
+    # Process system messages
+    @handles(HapcanMessage.ENTER_PROG_MODE_REQ)
+    def _onEnterProgModeReq(self, m):
+        resp = HapcanMessage.ENTER_PROG_MODE_REQ_RESP(senderNode=self.nodeId, senderGroup=self.groupId,
+                                                      bootVer=self.bootVer, bootRev=self.bootRev)
+        self.sendCanMessage(resp)
+
+
+    @handles(HapcanMessage.HW_TYPE_REQ_GROUP)
+    def _onHwTypeReqGroup(self, m):
+        self._sendIdentityResponses(HapcanMessage.HW_TYPE_REQ_GROUP_RESP, self._makeHwTypeResponses)
+
+
+    @handles(HapcanMessage.HW_TYPE_REQ_NODE)
+    def _onHwTypeReqNode(self, m):
+        self._sendIdentityResponses(HapcanMessage.HW_TYPE_REQ_NODE_RESP, self._makeHwTypeResponses)
+
+
+    @handles(HapcanMessage.FW_TYPE_REQ_GROUP)
+    def _onFwTypeReqGroup(self, m):
+        self._sendIdentityResponses(HapcanMessage.FW_TYPE_REQ_GROUP_RESP, self._makeFwTypeResponses)
+
+
+    @handles(HapcanMessage.FW_TYPE_REQ_NODE)
+    def _onFwTypeReqNode(self, m):
+        self._sendIdentityResponses(HapcanMessage.FW_TYPE_REQ_NODE_RESP, self._makeFwTypeResponses)
+
+
+    @handles(HapcanMessage.SET_DEFAULT_NODE_AND_GROUP_REQ)
+    def _onSetDefaultNodeAndGroupReq(self, m):
+        # Set node and group to default values derived from serial number
+        self.nodeId = self.serialNumber>>8 & 0xFF
+        self.groupId = self.serialNumber & 0xFF
+        resp = HapcanMessage.SET_DEFAULT_NODE_AND_GROUP_REQ_RESP(newNodeId=self.nodeId, newGroupId=self.groupId)
+        self.sendCanMessage(resp)
+
+
+    @handles(HapcanMessage.SUPPLY_VOLT_REQ_GROUP)
+    def _onSupplyVoltReqGroup(self, m):
+        self._sendIdentityResponses(HapcanMessage.SUPPLY_VOLT_REQ_GROUP_RESP, self._makeSupplyVoltResponses)
+
+
+    @handles(HapcanMessage.SUPPLY_VOLT_REQ_NODE)
+    def _onSupplyVoltReqNode(self, m):
+        self._sendIdentityResponses(HapcanMessage.SUPPLY_VOLT_REQ_NODE_RESP, self._makeSupplyVoltResponses)
+
+
+    @handles(HapcanMessage.DESC_REQ_GROUP)
+    def _onDescReqGroup(self, m):
+        self._sendIdentityResponses(HapcanMessage.DESC_REQ_GROUP_RESP, self._makeDescResponses)
+
+
+    @handles(HapcanMessage.DESC_REQ_NODE)
+    def _onDescReqNode(self, m):
+        self._sendIdentityResponses(HapcanMessage.DESC_REQ_NODE_RESP, self._makeDescResponses)
+
+
+    # Identity responses, the group and node variants only differ in their message class
+    def _makeHwTypeResponses(self, responseClass):
+        return (responseClass(senderNode=self.nodeId, senderGroup=self.groupId,
+                              hard=self.hard, hVer=self.hVer, serialNumber=self.serialNumber),)
+
+
+    def _makeFwTypeResponses(self, responseClass):
+        return (responseClass(senderNode=self.nodeId, senderGroup=self.groupId,
+                              hard=self.hard, hVer=self.hVer, aType=self.aType,
+                              aVers=self.aVers, fVers=self.fVers,
+                              bootVer=self.bootVer, bootRev=self.bootRev),)
+
+
+    def _makeSupplyVoltResponses(self, responseClass):
+        return (responseClass(senderNode=self.nodeId, senderGroup=self.groupId,
+                              rawVBus=self.rawVBus, rawVCpu=self.rawVCpu),)
+
+
+    def _makeDescResponses(self, responseClass):
+        desc0 = self.description[0:8]
+        desc1 = self.description[8:16]
+        return (responseClass(senderNode=self.nodeId, senderGroup=self.groupId, desc=desc0),
+                responseClass(senderNode=self.nodeId, senderGroup=self.groupId, desc=desc1))
+
+
+    def _sendIdentityResponses(self, responseClass, make):
+        # Responses are built, encoded and frozen once and re-sent as they are until
+        # the device memories (identity, nodeId/groupId, description) or the raw voltages change
+        state = (self.memory.version, self.rawVBus, self.rawVCpu)
+        cached = self._identityResponses.get(responseClass)
+        if cached is None or cached[0] != state:
+            responses = make(responseClass)
+            for resp in responses:
+                resp.to_bytes()
+                resp.freeze()
+            cached = self._identityResponses[responseClass] = (state, responses)
+        for resp in cached[1]:
+            self.sendCanMessage(resp)
+
+
     def process(self):
-        # May be handled by subclasses which need to process something in a loop
+        # May be handled by subclasses which need to process something in a loop, they are then polled by the emulator
+        # Prefer schedule(), which only wakes the device when it is due
+        pass
+
+
+    def schedule(self, delay, callback=None, *args, interval=None):
+        # Service the device after delay seconds, by default by calling process(), and then every interval seconds
+        # Returns the Timer, cancel() it when no longer needed, the timers of a removed device are cancelled
+        return self._emulator.schedule(delay, callback or self.process, *args, interval=interval, owner=self)
+
+
+    async def run(self):
+        # Coroutine run as a task by HapcanEmulator.run() when overridden, e.g. to wait for input of a transport
         pass
 
 
     def sendCanMessage(self, message:HapcanMessage):
         message._sender = self
-        self._emulator.broadcastCanMessage(message)
\ No newline at end of file
+        self._emulator.broadcastCanMessage(message, self)
+
+
+HapcanDevice._build_handler_table()
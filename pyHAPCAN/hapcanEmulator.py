@@ -1,41 +1,482 @@
+import asyncio
+import heapq
+import itertools
 import time
+from bisect import insort
+from collections import deque
+from enum import IntEnum
 
 from .hapcanMessage import HapcanMessage#, HapcanMessageType
 from .hapcanDevice import HapcanDevice
+from .hapcanMemory import Memory, MemoryImage
+
+
+class SourceStats:
+    # Frames of one source, see HapcanEmulator.sourceStats
+
+    def __init__(self, now):
+        self.sent = 0 # Frames offered to the emulator, including the dropped ones
+        self.dropped = 0 # Frames dropped by the rate limit, loop detection or a full queue
+        self.first = now
+        self.last = now
+        self._tokens = None # Token bucket of the rate limit, full on the first frame
+        self._refilled = now
+
+    @property
+    def rate(self):
+        # Average frames per second since the first frame
+        elapsed = self.last - self.first
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+
+class Timer:
+    # Service registered with HapcanEmulator.schedule(), fired once or every interval seconds until cancelled
+
+    def __init__(self, due, callback, args, interval, owner):
+        self.due = due # HapcanEmulator clock time of the next call
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.owner = owner # Device whose removal cancels the timer, or None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
 
 
 class HapcanEmulator():
 
+    class OVERFLOW(IntEnum):
+        DROP_NEWEST = 1 # The message being sent is dropped
+        DROP_OLDEST = 2 # The oldest queued message is dropped to make room
+        RAISE = 3 # OverflowError is raised to the sender
+
+    _loop = None # Running asyncio loop while run() is active
+
+    POLL_INTERVAL = 0.001 # Seconds between process() calls of devices polled instead of scheduling their own timers
+
     def __del__(self):
         self.stopFlag = True
 
 
-    def __init__(self):
+    def __init__(self, memoryImage:MemoryImage=None, maxQueueDepth=65536, overflowPolicy=OVERFLOW.DROP_NEWEST,
+                 sourceRateLimit=None, loopLimit=None, loopWindow=0.1):
         self.stopFlag = False
         self._devices = []
+        if memoryImage is not None and memoryImage.size is None:
+            raise ValueError(f"Memory image {memoryImage.path} of a network needs a size, e.g. "
+                             "MemoryImage(path, size=devices * sum(region.size for region in HapcanDevice.MEMORY_REGIONS))")
+        self.memoryImage = memoryImage # Optional, file the memories of all created devices are packed into
+        self._snapshotDevices = None # Devices at the last snapshot()
+
+        # Delivery queue, messages sent while one is delivered wait their turn instead of recursing
+        self._queue = deque()
+        self._delivering = False
+        self._clock = time.monotonic
+        self.maxQueueDepth = maxQueueDepth
+        self.overflowPolicy = overflowPolicy
+        self.sourceRateLimit = sourceRateLimit # Frames per second allowed from each source with bursts of one second, None for no limit
+        self.sourceStats = {} # Sending device (None for frames from outside) -> SourceStats, until the device is removed
+
+        # Forwarding loop detection, the same frame sent more than loopLimit times within loopWindow seconds is dropped
+        # Off by default, legitimate traffic repeats identical frames too, e.g. a programmer reading memory block by block
+        self.loopLimit = loopLimit # None to disable, e.g. 32 for networks bridged by serial interfaces
+        self.loopWindow = loopWindow
+        self._recentFrames = {} # Frame bytes -> times sent in the current window
+        self._loopWindowStart = 0.0
+
+        # Routing indexes, addressed messages only reach their addressees and the listeners
+        self._listeners = [] # Devices receiving every message, e.g. serial interfaces and application modules
+        self._routes = {} # Routed device -> (nodeId, groupId) it is indexed under
+        self._byAddress = {} # (nodeId, groupId) -> routed devices
+        self._byGroup = {} # groupId -> routed devices
+        self._routedTypes = set() # Message classes handled by any routed device, others only reach the listeners
+        self._filters = [] # (device, AcceptanceFilter) of devices declaring ACCEPTANCE_FILTERS, in device order
+        self._filterCache = {} # Frame type -> the entries of _filters accepting it, compiled on first use
+        self._rank = {} # Device -> creation order, recipients taken from several indexes are served in this order
+        self._nextRank = 0
+
+        # Timer heap, only devices which registered a timer are woken, passive nodes cost nothing while idle
+        self._timers = [] # (due, sequence, Timer), cancelled timers are dropped when they reach the top
+        self._timerSequence = itertools.count() # Keeps timers due at the same time in scheduling order
+        self._timerHandle = None # asyncio callback firing the earliest timer while run() is active
+        self._clockResolution = time.get_clock_info("monotonic").resolution
+        self._pollTimers = {} # Device -> Timer polling its process() while the emulator runs
+
+        self._tasks = {} # Device -> task running its run() coroutine while the emulator runs
+        self._stopEvent = None
+        self._failure = None # First exception raised by a device task, re-raised by run()
+
+
+    @property
+    def stopFlag(self):
+        return self._stopFlag
+
+    @stopFlag.setter
+    def stopFlag(self, value):
+        # Setting stopFlag, also from another thread, makes run() and processLoop() return
+        self._stopFlag = value
+        if value and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._stopEvent.set)
+            except RuntimeError:
+                pass # Loop already closed
 
 
     def addDevice(self, device:HapcanDevice):
         self._devices.append(device)
+        self._addRoute(device)
+        if self._loop is not None:
+            self._startDevice(device)
 
     def createDevice(self, deviceClass, *args, **kwargs) -> HapcanDevice:
+        if self.memoryImage is not None:
+            kwargs.setdefault("memoryImage", self.memoryImage)
         device = deviceClass(emulator=self, *args, **kwargs)
         self.addDevice(device)
         return device
 
     def removeDevice(self, device:HapcanDevice):
         self._devices.remove(device)
+        self._removeRoute(device)
+        task = self._tasks.pop(device, None)
+        if task is not None:
+            task.cancel()
+        self._pollTimers.pop(device, None)
+        self.sourceStats.pop(device, None) # Would otherwise keep the removed device alive
+        for _, _, timer in self._timers:
+            if timer.owner is device:
+                timer.cancel()
+
+    def close(self):
+        # Stop, release the memories of all devices and close the memory images they are stored in
+        self.stopFlag = True
+        images = [self.memoryImage]
+        for d in self._devices:
+            images.append(getattr(d, "_memoryImage", None))
+            close = getattr(d, "close", None)
+            if close is not None:
+                close()
+        for image in dict.fromkeys(images):
+            if image is not None:
+                image.close()
+
+    def loadTopology(self, path, deviceClass=HapcanDevice) -> list:
+        # Create all devices described in a JSON or CSV topology file at once, see HapcanTopology
+        from .hapcanTopology import HapcanTopology # numpy is only needed for bulk loading
+        return HapcanTopology.from_file(path).createDevices(self, deviceClass)
+
+
+    def deduplicateMemory(self) -> int:
+        # Share identical memory pages of all devices copy-on-write, e.g. after flashing one firmware into many devices
+        return Memory.deduplicate(mem for d in self._devices for mem in d.memory)
+
+
+    def snapshot(self):
+        # Restore point of the whole network, e.g. taken once before a series of test cases
+        self._snapshotDevices = list(self._devices)
+        for d in self._devices:
+            d.snapshot()
+
+
+    def restore(self):
+        # Return the network to the last snapshot(), devices created since are dropped and removed ones come back
+        if self._snapshotDevices is None:
+            raise RuntimeError("Emulator has no snapshot to restore")
+        # Created devices are removed as by removeDevice(), stopping their tasks and timers, and removed devices are
+        # started again if the emulator runs. Messages still queued belong to the discarded state
+        snapshotDevices = set(self._snapshotDevices)
+        for d in [d for d in self._devices if d not in snapshotDevices]:
+            self.removeDevice(d)
+        devices = set(self._devices)
+        returning = [d for d in self._snapshotDevices if d not in devices]
+        self._devices = list(self._snapshotDevices)
+        self._rebuildRoutes()
+        if self._loop is not None:
+            for d in returning:
+                self._startDevice(d)
+        self._queue.clear()
+        for d in self._devices:
+            d.restore() # Devices whose address is restored update their route
+
 
+    def _addRoute(self, device, rank=None):
+        if rank is None:
+            rank = self._nextRank
+            self._nextRank += 1
+        self._rank[device] = rank
+        # Filters set for the device, other device types only declare them as ACCEPTANCE_FILTERS
+        filters = getattr(device, "_acceptanceFilters", getattr(device, "ACCEPTANCE_FILTERS", None))
+        if filters is None and getattr(device, "_receivesAll", True):
+            insort(self._listeners, device, key=self._rank.__getitem__)
+            return
+        if filters:
+            self._filters.extend((device, f) for f in filters)
+            self._filters.sort(key=lambda entry: self._rank[entry[0]])
+            self._filterCache.clear()
+        if isinstance(device, HapcanDevice):
+            self._routedTypes.update(device._messageHandlers)
+            self._index(device)
 
-    def broadcastCanMessage(self, message:HapcanMessage):
+    def _removeRoute(self, device):
+        if device in self._routes:
+            self._unindex(device)
+        if device in self._listeners:
+            self._listeners.remove(device)
+        if any(d is device for d, f in self._filters):
+            self._filters = [(d, f) for d, f in self._filters if d is not device]
+            self._filterCache.clear()
+        return self._rank.pop(device)
+
+    def _refreshRoute(self, device):
+        # Called by a device whose acceptance filters changed
+        if device in self._rank:
+            self._addRoute(device, self._removeRoute(device))
+
+    def _rebuildRoutes(self):
+        self._listeners, self._routes, self._byAddress, self._byGroup, self._rank = [], {}, {}, {}, {}
+        self._filters, self._filterCache = [], {}
         for d in self._devices:
-            if message._sender == d: continue # Don't send the message back to the sender
-            d.processCanMessage(message)
+            self._addRoute(d)
+
+    def _index(self, device):
+        key = self._routes[device] = (device.nodeId, device.groupId)
+        for index, k in ((self._byAddress, key), (self._byGroup, key[1])):
+            insort(index.setdefault(k, []), device, key=self._rank.__getitem__)
+
+    def _unindex(self, device):
+        key = self._routes.pop(device)
+        for index, k in ((self._byAddress, key), (self._byGroup, key[1])):
+            index[k].remove(device)
+            if not index[k]:
+                del index[k]
+
+    def _updateRoute(self, device):
+        # Called by a device whose nodeId or groupId changed
+        if device in self._routes:
+            self._unindex(device)
+            self._index(device)
+
+
+    def _recipients(self, message:HapcanMessage):
+        # The listeners, the routed devices the message is addressed to and the devices whose filters accept it,
+        # in device order
+        cls = type(message)
+        routed = None
+        if cls in self._routedTypes:
+            if cls.TARGET_GROUP is None:
+                return self._devices
+            group = getattr(message, cls.TARGET_GROUP)
+            if cls.TARGET_NODE is not None:
+                routed = self._byAddress.get((getattr(message, cls.TARGET_NODE), group))
+            elif group == 0:
+                return self._devices
+            else:
+                routed = self._byGroup.get(group)
+        accepted = self._accepted(message) if self._filters else None
+
+        recipients = [devices for devices in (self._listeners, routed, accepted) if devices]
+        if len(recipients) == 1:
+            return list(recipients[0]) # A copy, handlers may change addresses while the message is delivered
+        return sorted(set().union(*recipients), key=self._rank.__getitem__)
+
+    def _accepted(self, message:HapcanMessage):
+        # Filters are matched against the frame type once per type, only those left are checked for node and group
+        frameType = type(message).FRAME_TYPE
+        if frameType is None:
+            frame = message.to_bytes()
+            frameType = frame[1] << 8 | frame[2]
+        candidates = self._filterCache.get(frameType)
+        if candidates is None:
+            candidates = self._filterCache[frameType] = [(d, f) for d, f in self._filters if f.matchesType(frameType)]
+        if not candidates:
+            return None
+        frame = message.to_bytes()
+        return list(dict.fromkeys(d for d, f in candidates if f.matchesAddress(frame[3], frame[4])))
+
+
+    def broadcastCanMessage(self, message:HapcanMessage, sender=None):
+        # Queue the message, the outermost call delivers the whole queue in FIFO order
+        # The sender travels with the queue entry, so shared (cached, frozen) messages are never modified,
+        # None takes the sender set on the message. Returns False if the message was dropped
+        if sender is None:
+            sender = message._sender
+        if not self._admit(message, sender):
+            return False
+        self._queue.append((message, sender))
+        if not self._delivering:
+            self._deliverQueue()
+        return True
+
+
+    def _deliverQueue(self):
+        self._delivering = True
+        try:
+            while self._queue:
+                message, sender = self._queue.popleft()
+                for d in self._recipients(message):
+                    if sender == d: continue # Don't send the message back to the sender
+                    d.processCanMessage(message)
+        finally:
+            # A handler raising drops the messages still queued, they would otherwise be delivered during some later,
+            # unrelated broadcast
+            self._queue.clear()
+            self._delivering = False
+
+
+    def _sourceStats(self, sender, now):
+        stats = self.sourceStats.get(sender)
+        if stats is None:
+            stats = self.sourceStats[sender] = SourceStats(now)
+        return stats
+
+
+    def _admit(self, message:HapcanMessage, sender):
+        # Rate accounting, then the rate limit, loop detection and the queue bound
+        now = self._clock()
+        stats = self._sourceStats(sender, now)
+        stats.sent += 1
+        stats.last = now
+
+        if self.sourceRateLimit is not None:
+            limit = self.sourceRateLimit
+            tokens = limit if stats._tokens is None else min(limit, stats._tokens + (now - stats._refilled) * limit)
+            stats._refilled = now
+            if tokens < 1:
+                stats._tokens = tokens
+                stats.dropped += 1
+                return False
+            stats._tokens = tokens - 1
+
+        if self.loopLimit is not None:
+            if now - self._loopWindowStart > self.loopWindow:
+                self._recentFrames.clear()
+                self._loopWindowStart = now
+            frame = message.to_bytes()
+            count = self._recentFrames[frame] = self._recentFrames.get(frame, 0) + 1
+            if count > self.loopLimit:
+                if count == self.loopLimit + 1:
+                    print("Forwarding loop detected, dropping repeated frame: " + frame.hex(sep=" "))
+                stats.dropped += 1
+                return False
+
+        if len(self._queue) >= self.maxQueueDepth:
+            if self.overflowPolicy == self.OVERFLOW.RAISE:
+                raise OverflowError(f"Message queue is full ({self.maxQueueDepth} messages)")
+            if self.overflowPolicy == self.OVERFLOW.DROP_NEWEST:
+                stats.dropped += 1
+                return False
+            _, oldestSender = self._queue.popleft()
+            self._sourceStats(oldestSender, now).dropped += 1
+        return True
+
+
+    def schedule(self, delay, callback, *args, interval=None, owner=None) -> Timer:
+        """
+        Call callback(*args) after delay seconds, and then every interval seconds if given, while run() is active.
+        Timers due while the emulator is not running fire as soon as it runs. Removing the owner device cancels them.
+        """
+        due = self._clock() + delay
+        timer = Timer(due, callback, args, interval, owner)
+        heapq.heappush(self._timers, (due, next(self._timerSequence), timer))
+        if self._loop is not None and self._timers[0][2] is timer:
+            self._armTimers()
+        return timer
+
+
+    def _armTimers(self):
+        # One asyncio callback at a time, at the deadline of the earliest timer which is not cancelled
+        if self._timerHandle is not None:
+            self._timerHandle.cancel()
+            self._timerHandle = None
+        timers = self._timers
+        while timers and timers[0][2].cancelled:
+            heapq.heappop(timers)
+        if not timers:
+            return
+        # The deadline is converted to the loop clock, the emulator clock may be a different one
+        delay = timers[0][0] - self._clock()
+        self._timerHandle = self._loop.call_at(self._loop.time() + delay, self._fireTimers)
+
+
+    def _fireTimers(self):
+        self._timerHandle = None
+        timers = self._timers
+        # asyncio runs callbacks up to one clock resolution early, timers due within it are fired as well
+        now = self._clock() + self._clockResolution
+        try:
+            while timers and timers[0][0] <= now:
+                _, _, timer = heapq.heappop(timers)
+                if timer.cancelled:
+                    continue
+                if timer.interval is not None:
+                    # Periodic timers keep their phase, unless they fell behind by more than one interval
+                    timer.due = max(timer.due + timer.interval, now)
+                    heapq.heappush(timers, (timer.due, next(self._timerSequence), timer))
+                timer.callback(*timer.args)
+        except Exception as e:
+            self._fail(e)
+            return
+        if self._loop is not None and self._timerHandle is None:
+            self._armTimers()
+
+
+    async def run(self):
+        """
+        Run the devices in the running asyncio loop until stopFlag is set. Devices with a run() coroutine of their own
+        run as tasks, devices overriding process() are polled every POLL_INTERVAL seconds and all other devices only
+        react to messages and to the timers they schedule, so the loop cost scales with the active devices and timers.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopEvent = asyncio.Event()
+        self._failure = None
+        if self._stopFlag:
+            self._stopEvent.set()
+        for d in self._devices:
+            self._startDevice(d)
+        self._armTimers()
+        try:
+            await self._stopEvent.wait()
+        finally:
+            if self._timerHandle is not None:
+                self._timerHandle.cancel()
+                self._timerHandle = None
+            tasks = list(self._tasks.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for timer in self._pollTimers.values():
+                timer.cancel()
+            self._tasks = {}
+            self._pollTimers = {}
+            self._loop = None
+        if self._failure is not None:
+            raise self._failure
+
+
+    def _startDevice(self, device):
+        cls = type(device)
+        if getattr(cls, "run", HapcanDevice.run) is not HapcanDevice.run:
+            task = self._tasks[device] = self._loop.create_task(device.run())
+            task.add_done_callback(self._onTaskDone)
+        elif getattr(cls, "process", HapcanDevice.process) is not HapcanDevice.process:
+            self._pollTimers[device] = self.schedule(self.POLL_INTERVAL, device.process,
+                                                     interval=self.POLL_INTERVAL, owner=device)
+
+    def _onTaskDone(self, task):
+        # Devices with nothing more to run simply finish
+        if not task.cancelled() and task.exception() is not None:
+            self._fail(task.exception())
+
+    def _fail(self, exception):
+        # A failing device task or timer stops the emulator, run() re-raises the first exception
+        if self._failure is None:
+            self._failure = exception
+            self._stopEvent.set()
 
 
     def processLoop(self):
-        while not self.stopFlag:
-            for d in self._devices:
-                d.process()
-            time.sleep(0.001)
+        # Synchronous entry point, runs run() in a new asyncio loop until stopFlag is set
+        asyncio.run(self.run())
             
\ No newline at end of file
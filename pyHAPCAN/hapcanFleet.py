@@ -0,0 +1,235 @@
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("DeviceFleet requires numpy, install it with 'pip install numpy'") from e
+
+from .hapcanMessage import HapcanMessage
+from .hapcanDevice import AcceptanceFilter, HapcanDevice, handles
+from .hapcanMemory import MemoryImage, MemoryMap
+
+
+EEPROM_SIZE = 0x400
+# Offsets in the EEPROM, as the MemoryField addresses of HapcanDevice
+_NODE_ID = HapcanDevice.nodeId.address - 0xF00000
+_GROUP_ID = HapcanDevice.groupId.address - 0xF00000
+_DESCRIPTION = HapcanDevice.description.address - 0xF00000
+
+
+
+class DeviceFleet:
+    """
+    Many plain HapcanDevice nodes stored as columns, one row per node, e.g. for scale tests with thousands of nodes.
+    Added to a HapcanEmulator like a single device, a request is answered for all addressed nodes at once:
+    the response frames of every node are built in one vectorized step and then broadcast one by one.
+    nodeId, groupId and description are views of the EEPROM rows, so writing either keeps both in sync.
+    Only the identity requests are answered (hardware/firmware type, supply voltage, description) and accepted,
+    see ACCEPTANCE_FILTERS, nodes of a fleet cannot be programmed.
+    """
+
+    # Column name -> (dtype, largest value), every constructor argument is a scalar or one value per node
+    COLUMNS = {
+        "serialNumber": (np.uint32, 0xFFFFFFFF),
+        "hard": (np.uint16, 0xFFFF),
+        "hVer": (np.uint8, 0xFF),
+        "aType": (np.uint8, 0xFF),
+        "aVers": (np.uint8, 0xFF),
+        "fVers": (np.uint8, 0xFF),
+        "bootVer": (np.uint8, 0xFF),
+        "bootRev": (np.uint8, 0xFF),
+        "rawVBus": (np.uint16, 0xFFFF),
+        "rawVCpu": (np.uint16, 0xFFFF),
+    }
+
+    _messageHandlers = {} # Message class -> handler function, built at the end of the module
+
+
+    def __init__(self, emulator, nodeId, groupId, serialNumber, aType,
+                 hard=0x3000, hVer=0x03, aVers=0x00, fVers=0x00,
+                 bootVer=0x00, bootRev=0x00, description="",
+                 rawVBus=0x0000, rawVCpu=0x0000, memoryImage:MemoryImage=None):
+
+        values = {"nodeId": nodeId, "groupId": groupId, "serialNumber": serialNumber, "aType": aType,
+                  "hard": hard, "hVer": hVer, "aVers": aVers, "fVers": fVers,
+                  "bootVer": bootVer, "bootRev": bootRev, "rawVBus": rawVBus, "rawVCpu": rawVCpu}
+        count = np.broadcast(*(np.asarray(v) for v in values.values())).size
+        if isinstance(description, str):
+            description = [description] * count
+        elif len(description) != count:
+            raise ValueError(f"description must be a string or one string per node, got {len(description)} for {count} nodes")
+
+        # Validate all nodes of each column at once
+        for name, value in values.items():
+            value = np.asarray(value)
+            limit = self.COLUMNS.get(name, (np.uint8, 0xFF))[1]
+            if value.dtype.kind not in "iu":
+                raise TypeError(f"{name} must be integers (0–{limit}), got {value.dtype}")
+            if value.size and (value.min() < 0 or value.max() > limit):
+                raise ValueError(f"{name} must be in range 0–{limit}")
+        for text in description:
+            if not isinstance(text, str):
+                raise TypeError(f"description must be a string, got {type(text).__name__}")
+            if len(text) > 16:
+                raise ValueError(f"description must be 16 characters or less, got {len(text)}")
+
+        self._emulator = emulator
+        self.memory = MemoryMap() # The EEPROM rows are not Memory objects
+        self._snapshot = None
+
+        for name, (dtype, limit) in self.COLUMNS.items():
+            setattr(self, name, np.broadcast_to(np.asarray(values[name], dtype=dtype), (count,)).copy())
+
+        newMemory = True
+        self._memoryImage = memoryImage
+        if memoryImage is not None:
+            image, newMemory = memoryImage.allocate(count * EEPROM_SIZE)
+            self.eeprom = np.frombuffer(image, dtype=np.uint8).reshape(count, EEPROM_SIZE)
+        else:
+            self.eeprom = np.full((count, EEPROM_SIZE), 0xFF, dtype=np.uint8)
+        self.nodeId = self.eeprom[:, _NODE_ID]
+        self.groupId = self.eeprom[:, _GROUP_ID]
+        self.description = self.eeprom[:, _DESCRIPTION:_DESCRIPTION+16]
+
+        # Set initial values, EEPROM rows loaded from an image keep the values programmed before
+        if newMemory:
+            self.nodeId[:] = values["nodeId"]
+            self.groupId[:] = values["groupId"]
+            self.description[:] = np.frombuffer(b"".join(text.encode("ascii", errors="ignore")[:16].ljust(16, b"\x00")
+                                                         for text in description), dtype=np.uint8).reshape(count, 16)
+
+
+    def __len__(self):
+        return len(self.eeprom)
+
+
+    def close(self):
+        # Drop the EEPROM rows, which may be a view of a memory image, the fleet is unusable afterwards
+        self.eeprom = self.nodeId = self.groupId = self.description = None
+
+
+    def processCanMessage(self, m: HapcanMessage):
+        handler = self._messageHandlers.get(type(m))
+        if handler is not None:
+            handler(self, m)
+
+
+    def snapshot(self):
+        # Fleets are compact, the restore point is a full copy of the columns and the EEPROM
+        self._snapshot = {name: getattr(self, name).copy() for name in self.COLUMNS}
+        self._snapshot["eeprom"] = self.eeprom.copy()
+
+
+    def restore(self):
+        if self._snapshot is None:
+            raise RuntimeError(f"{self.__class__.__name__} has no snapshot to restore")
+        for name, value in self._snapshot.items():
+            getattr(self, name)[:] = value
+
+
+    # Nodes addressed by a request, as an index array
+    def _groupMembers(self, m):
+        return np.flatnonzero(self.groupId == m.reqGroup) if m.reqGroup != 0 else np.arange(len(self))
+
+
+    def _node(self, m):
+        return np.flatnonzero((self.groupId == m.reqGroup) & (self.nodeId == m.reqNode))
+
+
+    @handles(HapcanMessage.HW_TYPE_REQ_GROUP)
+    def _onHwTypeReqGroup(self, m):
+        self._sendResponses(HapcanMessage.HW_TYPE_REQ_GROUP_RESP, self._groupMembers(m), self._hwTypeData)
+
+
+    @handles(HapcanMessage.HW_TYPE_REQ_NODE)
+    def _onHwTypeReqNode(self, m):
+        self._sendResponses(HapcanMessage.HW_TYPE_REQ_NODE_RESP, self._node(m), self._hwTypeData)
+
+
+    @handles(HapcanMessage.FW_TYPE_REQ_GROUP)
+    def _onFwTypeReqGroup(self, m):
+        self._sendResponses(HapcanMessage.FW_TYPE_REQ_GROUP_RESP, self._groupMembers(m), self._fwTypeData)
+
+
+    @handles(HapcanMessage.FW_TYPE_REQ_NODE)
+    def _onFwTypeReqNode(self, m):
+        self._sendResponses(HapcanMessage.FW_TYPE_REQ_NODE_RESP, self._node(m), self._fwTypeData)
+
+
+    @handles(HapcanMessage.SUPPLY_VOLT_REQ_GROUP)
+    def _onSupplyVoltReqGroup(self, m):
+        self._sendResponses(HapcanMessage.SUPPLY_VOLT_REQ_GROUP_RESP, self._groupMembers(m), self._supplyVoltData)
+
+
+    @handles(HapcanMessage.SUPPLY_VOLT_REQ_NODE)
+    def _onSupplyVoltReqNode(self, m):
+        self._sendResponses(HapcanMessage.SUPPLY_VOLT_REQ_NODE_RESP, self._node(m), self._supplyVoltData)
+
+
+    @handles(HapcanMessage.DESC_REQ_GROUP)
+    def _onDescReqGroup(self, m):
+        self._sendResponses(HapcanMessage.DESC_REQ_GROUP_RESP, np.repeat(self._groupMembers(m), 2), self._descData)
+
+
+    @handles(HapcanMessage.DESC_REQ_NODE)
+    def _onDescReqNode(self, m):
+        self._sendResponses(HapcanMessage.DESC_REQ_NODE_RESP, np.repeat(self._node(m), 2), self._descData)
+
+
+    # Data bytes of the responses of the given nodes, one row per response
+    @staticmethod
+    def _bigEndian(column, size):
+        return (column[:, None] >> np.arange(8 * (size - 1), -1, -8, dtype=column.dtype)).astype(np.uint8)
+
+
+    def _hwTypeData(self, nodes):
+        data = np.full((len(nodes), 8), 0xFF, dtype=np.uint8)
+        data[:, 0:2] = self._bigEndian(self.hard[nodes], 2)
+        data[:, 2] = self.hVer[nodes]
+        data[:, 4:8] = self._bigEndian(self.serialNumber[nodes], 4)
+        return data
+
+
+    def _fwTypeData(self, nodes):
+        data = np.empty((len(nodes), 8), dtype=np.uint8)
+        data[:, 0:2] = self._bigEndian(self.hard[nodes], 2)
+        for i, name in enumerate(("hVer", "aType", "aVers", "fVers", "bootVer", "bootRev"), 2):
+            data[:, i] = getattr(self, name)[nodes]
+        return data
+
+
+    def _supplyVoltData(self, nodes):
+        data = np.full((len(nodes), 8), 0xFF, dtype=np.uint8)
+        data[:, 0:2] = self._bigEndian(self.rawVBus[nodes], 2)
+        data[:, 2:4] = self._bigEndian(self.rawVCpu[nodes], 2)
+        return data
+
+
+    def _descData(self, nodes):
+        # nodes lists every node twice, for the first and the second half of its description
+        return self.description[nodes[0::2]].reshape(-1, 8)
+
+
+    def _sendResponses(self, responseClass, nodes, makeData):
+        if not len(nodes):
+            return
+        frames = np.empty((len(nodes), HapcanMessage.FRAME_LENGTH), dtype=np.uint8)
+        frames[:, 0] = 0xAA
+        frames[:, 1] = responseClass.FRAME_TYPE >> 8
+        frames[:, 2] = responseClass.FRAME_TYPE & 0xFF
+        frames[:, 3] = self.nodeId[nodes]
+        frames[:, 4] = self.groupId[nodes]
+        frames[:, 5:13] = makeData(nodes)
+        frames[:, 13] = frames[:, 1:13].sum(axis=1, dtype=np.uint16) & 0xFF
+        frames[:, 14] = 0xA5
+
+        # Each frame is delivered as a message of its own, decoded only if a receiver reads its fields
+        buffer = frames.tobytes()
+        frameLength = HapcanMessage.FRAME_LENGTH
+        for offset in range(0, len(buffer), frameLength):
+            message = HapcanMessage.from_bytes(buffer[offset:offset+frameLength], lazy=True)
+            self._emulator.broadcastCanMessage(message, self)
+
+
+
+DeviceFleet._messageHandlers = {messageClass: function for function in vars(DeviceFleet).values()
+                                for messageClass in getattr(function, "_handles", ())}
+DeviceFleet.ACCEPTANCE_FILTERS = tuple(AcceptanceFilter(messageClass) for messageClass in DeviceFleet._messageHandlers)
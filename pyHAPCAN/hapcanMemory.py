@@ -1,24 +1,259 @@
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from copy import copy
 from enum import IntEnum
 
 
 
 class Memory:
+    """
+    Sparse paged memory. Pages never written are not allocated and read as erased (0xFF).
+    A page is either a private bytearray or a bytes object shared copy-on-write with other memories,
+    see copy() and deduplicate(), which is replaced by a private copy on its first write.
+    A memory given a backing buffer, e.g. a slice of a MemoryImage, keeps its content there instead and every page
+    is a writable view of the buffer.
+    After snapshot() the content of every page before its first modification is kept, so restore() only has to
+    put back the pages modified since.
+    """
+
     class OPERATION(IntEnum):
         READ = 1
         WRITE = 2
 
-    def __init__(self, size, base_address=0x00):
-        self.data = bytearray([0xFF]*size)
+    def __init__(self, size, base_address=0x00, page_size=64, backing=None):
         self.base_address = base_address
+        self.size = size
+        self.page_size = page_size
+        self.version = 0 # Incremented by every modification
+        self._pages = {} # Page index -> bytes (shared) or bytearray (private), missing pages are erased
+        self._erased = bytes([0xFF]) * page_size
+        self._undo = None # Page index -> content at the last snapshot() of the pages modified since, None if not tracked
+        self._watches = [] # (start, end, callback) of watch()
+        self._backing = None
+        if backing is not None:
+            backing = memoryview(backing).cast("B")
+            if len(backing) != size or backing.readonly:
+                raise ValueError(f"Backing buffer must be a writable buffer of {size} bytes")
+            self._backing = backing
+            self._pages = _MappedPages(backing, page_size)
 
-    def read(self, address, length):
-        # Adjust address relative to base_address
+    @property
+    def data(self):
+        # Read-only snapshot of the whole memory, modify it with write(), item assignment fails instead of being lost
+        return bytes(self.read(self.base_address, self.size))
+
+    def _page_of(self, address, length):
+        # (page index, start offset) of a range within a single page, None for a range spanning pages
         idx = address - self.base_address
-        return self.data[idx:idx+length]
+        page, start = divmod(idx, self.page_size)
+        if start + length <= self.page_size and idx >= 0 and idx + length <= self.size:
+            return page, start
+        return None
 
-    def write(self, address, values):
+    def _spans(self, address, length):
+        # (page index, start and end offset in the page, position in the range) of each page the range touches
         idx = address - self.base_address
-        self.data[idx:idx+len(values)] = values
+        if idx < 0 or idx + length > self.size:
+            raise ValueError(f"Range {hex(address)}+{length} is outside memory {hex(self.base_address)}-{hex(self.base_address + self.size - 1)}")
+        pos = 0
+        while pos < length:
+            page, start = divmod(idx + pos, self.page_size)
+            end = min(self.page_size, start + length - pos)
+            yield page, start, end, pos
+            pos += end - start
+
+    def _writable_page(self, page):
+        # Copy on write, shared and never written pages get a private copy first
+        data = self._pages.get(page)
+        if self._undo is not None and page not in self._undo:
+            self._save_page(page, data)
+            if self._backing is None and data is not None:
+                data = self._pages[page] = bytearray(data) # The saved page object is kept unchanged
+                return data
+        if data is None or type(data) is bytes:
+            data = self._pages[page] = bytearray(self._erased if data is None else data)
+        return data
+
+    def read(self, address, length):
+        # Copy of a range as a new bytearray
+        single = self._page_of(address, length)
+        if single is not None:
+            page, start = single
+            return bytearray(memoryview(self._pages.get(page, self._erased))[start:start+length])
+
+        out = bytearray(length)
+        for page, start, end, pos in self._spans(address, length):
+            out[pos:pos+end-start] = self._pages.get(page, self._erased)[start:end]
+        return out
+
+    def view(self, address, length):
+        """
+        Return a read-only memoryview of a range without copying it when the range lies within one page,
+        e.g. for decoding. The view follows writes to the page only until the page is replaced by copy-on-write
+        (the first write to a shared page or the first write after snapshot()) or restore(), use it right away.
+        A range spanning pages is a view of a copy.
+        """
+        single = self._page_of(address, length)
+        if single is not None:
+            page, start = single
+            return memoryview(self._pages.get(page, self._erased))[start:start+length].toreadonly()
+        return memoryview(self.read(address, length)).toreadonly()
+
+    def write(self, address, values):
+        # Any range, page by page with slice assignments
+        values = values if isinstance(values, (bytes, bytearray)) else bytes(values)
+        single = self._page_of(address, len(values))
+        if single is not None:
+            page, start = single
+            self._writable_page(page)[start:start+len(values)] = values
+        else:
+            for page, start, end, pos in self._spans(address, len(values)):
+                self._writable_page(page)[start:end] = values[pos:pos+end-start]
+        self.version += 1
+        if self._watches:
+            self._notify(address, len(values))
+
+    # Bulk writes spanning many pages, e.g. a whole image
+    write_range = write
+
+    def load_pages(self, pages):
+        # Replace whole pages, page index -> bytes kept shared copy-on-write, e.g. the initial content of devices created in bulk
+        for page, data in pages.items():
+            if self._undo is not None and page not in self._undo:
+                self._save_page(page, self._pages.get(page))
+            if self._backing is not None:
+                self._pages[page][:] = data
+            else:
+                self._pages[page] = data
+        self.version += 1
+        if self._watches:
+            self._notify(self.base_address, self.size)
+
+    def erase_range(self, address, length):
+        # Fill a range with 0xFF, whole pages are dropped instead of filled
+        for page, start, end, pos in self._spans(address, length):
+            if end - start == self.page_size:
+                if self._undo is not None and page not in self._undo:
+                    self._save_page(page, self._pages.get(page))
+                self._pages.pop(page, None)
+            elif page in self._pages:
+                self._writable_page(page)[start:end] = self._erased[start:end]
+        self.version += 1
+        if self._watches:
+            self._notify(address, length)
+
+    def release(self):
+        # Release the views of the backing buffer, e.g. before its MemoryImage is closed, the memory is unusable afterwards
+        if self._backing is not None:
+            for view in dict.values(self._pages):
+                view.release()
+            self._backing.release()
+
+    def watch(self, address, length, callback):
+        # Call callback() after every modification of the range, e.g. to follow a device address
+        self._watches.append((address, address + length, callback))
+
+    def _notify(self, address, length):
+        for start, end, callback in self._watches:
+            if address < end and start < address + length:
+                callback()
+
+    def _save_page(self, page, data):
+        # Content before the first modification since the snapshot, views of a backing buffer have to be copied
+        self._undo[page] = bytes(data) if self._backing is not None else data
+
+    @property
+    def dirtyPages(self):
+        # Indexes of the pages modified since the last snapshot()
+        return set(self._undo or ())
+
+    def snapshot(self):
+        # Make the current content the one restore() returns to, nothing is copied until pages are modified
+        self._undo = {}
+
+    def restore(self):
+        # Return to the content at the last snapshot(), only the pages modified since are touched
+        if not self._undo:
+            return
+        for page, data in self._undo.items():
+            if self._backing is not None:
+                self._pages[page][:] = data
+            elif data is None:
+                self._pages.pop(page, None)
+            else:
+                self._pages[page] = data
+        self._undo = {}
+        self.version += 1
+        if self._watches:
+            self._notify(self.base_address, self.size)
+
+    def copy(self):
+        """
+        Return a memory with the same content sharing all pages copy-on-write, e.g. one firmware image for many devices.
+        The copy of a memory with a backing buffer is kept in RAM.
+        """
+        pages = self._shared_pages({})
+        if self._backing is None:
+            self._pages = pages
+        clone = copy(self)
+        clone._undo = None
+        clone._watches = []
+        clone._backing = None
+        clone._pages = dict(pages)
+        return clone
+
+    @staticmethod
+    def deduplicate(memories):
+        """
+        Make identical pages of the given memories one shared copy-on-write page.
+        Memories with a backing buffer are left as they are.
+        Returns the number of distinct pages left.
+        """
+        pool = {}
+        for mem in memories:
+            if mem._backing is None:
+                mem._pages = mem._shared_pages(pool)
+        return len(pool)
+
+    def _shared_pages(self, pool):
+        # The pages as immutable bytes, identical pages become one object through pool, erased ones are dropped
+        pages = {}
+        for page, data in self._pages.items():
+            data = bytes(data)
+            if data != self._erased:
+                pages[page] = pool.setdefault(data, data)
+        return pages
+
+
+
+class _MappedPages(dict):
+    # Page table of a memory with a backing buffer, pages are views of the buffer created on first access
+
+    def __init__(self, buffer, page_size):
+        super().__init__()
+        self._buffer = buffer
+        self._page_size = page_size
+
+    def __missing__(self, page):
+        view = self[page] = self._buffer[page*self._page_size:(page+1)*self._page_size]
+        return view
+
+    def __contains__(self, page):
+        return True
+
+    def get(self, page, default=None):
+        return self[page]
+
+    def pop(self, page, default=None):
+        # Dropping a page erases it in the buffer
+        view = self[page]
+        view[:] = b"\xFF" * len(view)
+        return view
+
+    def items(self):
+        return ((page, self[page]) for page in range(-(-len(self._buffer) // self._page_size)))
 
 
 
@@ -28,56 +263,267 @@ class FlashMemory(Memory):
         WRITE = 2
         ERASE = 3
 
-    def __init__(self, size, base_address=0x00, page_size=64):
-        super().__init__(size, base_address)
-        self.page_size = page_size
+    def __init__(self, size, base_address=0x00, page_size=64, backing=None):
+        super().__init__(size, base_address, page_size, backing) # Erase pages are the allocation pages
 
     def write(self, address, values):
-        idx = address - self.base_address
-        for i, byte in enumerate(values):
-            old = self.data[idx+i]
-            new = byte
-            if (old | new) != old:
-                raise Exception(f"Flash write requires erase at {address+i}")
-            self.data[idx+i] = new
+        # Flash can only clear bits, the whole range is checked at once as big integers before anything is written
+        values = values if isinstance(values, (bytes, bytearray)) else bytes(values)
+        length = len(values)
+        single = self._page_of(address, length)
+        if single is not None:
+            page, start = single
+            old = int.from_bytes(self._pages.get(page, self._erased)[start:start+length], "big")
+        else:
+            old = int.from_bytes(self.view(address, length), "big")
+        setBits = (old | int.from_bytes(values, "big")) ^ old
+        if setBits:
+            # Highest set bit is the first offending byte
+            first = length - 1 - (setBits.bit_length() - 1) // 8
+            raise Exception(f"Flash write requires erase at {address+first}")
+
+        if single is not None:
+            self._writable_page(page)[start:start+length] = values
+            self.version += 1
+            if self._watches:
+                self._notify(address, length)
+        else:
+            super().write(address, values)
+
+    write_range = write
 
     def erase_page(self, address):
         # Check if address is aligned to page size
         if (address - self.base_address) % self.page_size != 0:
             raise ValueError(f"Address {hex(address)} is not aligned to page size {self.page_size}")
+        self.erase_range(address, self.page_size)
+
+    def erase_range(self, address, length):
+        # Erase all pages of a page aligned range, erased pages are not allocated
+        if (address - self.base_address) % self.page_size != 0 or length % self.page_size != 0:
+            raise ValueError(f"Range {hex(address)}+{length} is not aligned to page size {self.page_size}")
+        super().erase_range(address, length)
 
-        start = address - self.base_address
-        end = start + self.page_size
-        for i in range(start, end):
-            self.data[i] = 0xFF
+
+
+class MemoryRegion:
+    # Declaration of a memory of a device class, see HapcanDevice.MEMORY_REGIONS
+
+    def __init__(self, name, base_address, size, memoryClass=Memory, **kwargs):
+        self.name = name # Device attribute holding the memory
+        self.base_address = base_address
+        self.size = size
+        self.memoryClass = memoryClass
+        self.kwargs = kwargs # Passed to memoryClass, e.g. page_size
+
+    def contains(self, address):
+        return self.base_address <= address < self.base_address + self.size
+
+    def create(self, backing=None) -> Memory:
+        return self.memoryClass(size=self.size, base_address=self.base_address, backing=backing, **self.kwargs)
+
+
+
+class MemoryMap:
+    """
+    Address index over the memories of a device.
+    Memories are kept sorted by base address, so an address is resolved with one binary search.
+    """
+
+    def __init__(self, memories=()):
+        self._starts = []
+        self._memories = []
+        for mem in memories:
+            self.add(mem)
+
+    def add(self, mem:Memory):
+        i = bisect_right(self._starts, mem.base_address)
+        if (i > 0 and self._starts[i-1] + self._memories[i-1].size > mem.base_address) or \
+           (i < len(self._starts) and mem.base_address + mem.size > self._starts[i]):
+            raise ValueError(f"Memory at {hex(mem.base_address)} overlaps another memory")
+        self._starts.insert(i, mem.base_address)
+        self._memories.insert(i, mem)
+
+    def find(self, address) -> Memory:
+        i = bisect_right(self._starts, address) - 1
+        if i >= 0:
+            mem = self._memories[i]
+            if address < mem.base_address + mem.size:
+                return mem
+        raise ValueError(f"Address {hex(address)} is outside memory ranges")
+
+    def read(self, address, length):
+        return self.find(address).read(address, length)
+
+    def view(self, address, length):
+        return self.find(address).view(address, length)
+
+    def write(self, address, values):
+        self.find(address).write(address, values)
+
+    def __iter__(self):
+        return iter(self._memories)
+
+    @property
+    def version(self):
+        # Changes whenever any of the memories is modified, as their versions only grow
+        return sum(mem.version for mem in self._memories)
+
+
+
+class MemoryImage:
+    """
+    Memory-mapped file holding device memories, so their content persists across restarts without any serialization.
+    One image can hold the memories of a single device or of a whole network packed one device after another,
+    allocate() hands out consecutive ranges in the same order on every run. Pages are read from the file only
+    when used, so opening a large network is fast. New parts of the file are erased (0xFF).
+    The mapping cannot grow while memories use it, an image of a network needs a size unless the file exists.
+    """
+
+    def __init__(self, path, size=None):
+        self.path = path
+        self.closed = False
+        if size is None and os.path.exists(path):
+            size = os.path.getsize(path) or None # An existing image keeps its size
+        self.size = size # Fixed by the first allocate() if None, e.g. for the memories of a single device
+        self._mmap = None
+        self._offset = 0 # Next allocation
+        self._existing = 0 # Length of the file before it was opened, ranges within it keep their content
+
+    def _open(self, size):
+        mode = "r+b" if os.path.exists(self.path) else "w+b"
+        with open(self.path, mode) as f:
+            f.seek(0, os.SEEK_END)
+            self._existing = f.tell()
+            size = max(size, self._existing)
+            chunk = b"\xFF" * 0x100000
+            while f.tell() < size:
+                f.write(chunk[:size - f.tell()])
+            f.flush()
+            self._mmap = mmap.mmap(f.fileno(), size) # Keeps its own handle of the file
+        self.size = size
+
+    def allocate(self, length):
+        """
+        Return a writable view of the next length bytes of the image and whether they are new,
+        i.e. were not stored in the file yet and need to be initialized.
+        """
+        if self.closed:
+            raise ValueError(f"Memory image {self.path} is closed")
+        if self._mmap is None:
+            self._open(max(self.size or 0, self._offset + length))
+        start = self._offset
+        if start + length > self.size:
+            raise ValueError(f"Memory image {self.path} of {self.size} bytes is full")
+        self._offset += length
+        return memoryview(self._mmap)[start:start+length], start + length > self._existing
+
+    def flush(self):
+        # Write the modified pages to the file now instead of when the operating system decides to
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self):
+        """
+        Flush and unmap the image, which also releases the file. The memories stored in it must be released first,
+        see HapcanEmulator.close(), an mmap still viewed by a memory cannot be closed (BufferError).
+        """
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
 
 class MemoryField:
+    """
+    Typed view of device memory bytes. Decoded values are cached per device instance and reused until
+    the memory they live in is modified (Memory.version changes), whether by this field or by any other write.
+    Integer fields adjacent in the same region are chained into one group decoded with a single struct unpack.
+    """
+
+    _STRUCT_CODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
 
     def __init__(self, address, size, dtype=int):
         self.address = address
         self.size = size
         self.dtype = dtype # int, str, bytes
         self.name = None # Set by __set_name__
+        self.region = None # Name of the device attribute holding the memory, bound by __set_name__
+
+        # Group of adjacent fields decoded together, set by _group_fields()
+        self._groupAddress = address
+        self._struct = struct.Struct(">" + self._STRUCT_CODES[size]) if dtype == int and size in self._STRUCT_CODES else None
+        self._index = 0
+        self._cacheKey = None
 
     def __set_name__(self, owner, name):
         self.name = name
+        self._cacheKey = f"_{name}_cache"
+        # Bind to the region of the owner class once instead of resolving the address on every access
+        for region in getattr(owner, "MEMORY_REGIONS", ()):
+            if region.contains(self.address):
+                if not region.contains(self.address + self.size - 1):
+                    raise ValueError(f"MemoryField {name} crosses the end of memory region {region.name}")
+                self.region = region.name
+                break
+        self._group_fields(owner)
 
-    def __get__(self, instance, owner=None):
-        if instance is None:
-            return self
-        mem = instance._get_memory_by_address(self.address)
-        raw = mem.read(self.address, self.size)
+    @staticmethod
+    def _group_fields(owner):
+        # Chain the integer fields of owner following each other in the same region
+        fields = sorted((f for f in vars(owner).values() if isinstance(f, MemoryField) and f.name is not None and f._struct is not None),
+                        key=lambda f: f.address)
+        groups = []
+        for f in fields:
+            last = groups[-1][-1] if groups else None
+            if last is not None and last.region == f.region and last.address + last.size == f.address:
+                groups[-1].append(f)
+            else:
+                groups.append([f])
+
+        for group in groups:
+            fmt = ">" + "".join(MemoryField._STRUCT_CODES[f.size] for f in group)
+            decoder = struct.Struct(fmt)
+            for i, f in enumerate(group):
+                f._groupAddress = group[0].address
+                f._struct = decoder
+                f._index = i
+                f._cacheKey = group[0]._cacheKey if len(group) > 1 else f"_{f.name}_cache"
+
+    def _decode(self, mem):
+        # Values of all fields of the group
+        if self._struct is not None:
+            return self._struct.unpack(mem.view(self._groupAddress, self._struct.size))
+        raw = mem.view(self.address, self.size)
         if self.dtype == int:
-            return int.from_bytes(raw, 'big')
+            return (int.from_bytes(raw, 'big'),)
         elif self.dtype == str:
-            return raw.decode('ascii', errors='ignore').rstrip('\x00')
+            return (str(raw, 'ascii', errors='ignore').rstrip('\x00'),)
         else:
-            return raw
+            return (bytes(raw),) # Immutable, the value is shared by every read until the memory changes
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        state = instance.__dict__
+        mem = state[self.region] if self.region is not None else instance._get_memory_by_address(self.address)
+        cached = state.get(self._cacheKey)
+        if cached is not None and cached[0] is mem and cached[1] == mem.version:
+            return cached[2][self._index]
+        values = self._decode(mem)
+        state[self._cacheKey] = (mem, mem.version, values)
+        return values[self._index]
 
     def __set__(self, instance, value):
-        mem = instance._get_memory_by_address(self.address)
+        mem = instance.__dict__[self.region] if self.region is not None else instance._get_memory_by_address(self.address)
         if self.dtype == int:
             raw = int(value).to_bytes(self.size, 'big')
         elif self.dtype == str:
@@ -85,4 +531,4 @@ class MemoryField:
             raw = raw.ljust(self.size, b'\x00')
         else:
             raw = value
-        mem.write(self.address, raw)
\ No newline at end of file
+        mem.write(self.address, raw) # Changes mem.version, which invalidates the cached values
@@ -1,15 +1,99 @@
+import functools
+import importlib
+import operator
+import struct
+
+
+
+# Field kinds which can be used in a LAYOUT declaration, "name:kind", plain "name" is a single byte
+# B/H/I - big endian unsigned integers of 1/2/4 bytes, U - 3 byte big endian unsigned integer (memory addresses),
+# Ns - N raw bytes, Na - ASCII text of up to N characters padded with zeros
+_LAYOUT_ENCODE = {"B": "B", "H": "H", "I": "I", "U": "BH", "s": "s", "a": "s"}
+_LAYOUT_DECODE = {"B": "B", "H": "H", "I": "I", "U": "BH", "s": "x", "a": "x"}
+_LAYOUT_SIZE = {"B": 1, "H": 2, "I": 4, "U": 3}
+_LAYOUT_CHECKSUM = { # Sum of the bytes of a field value
+    "B": lambda value: value,
+    "H": lambda value: (value >> 8) + (value & 0xFF),
+    "I": lambda value: (value >> 24) + (value >> 16 & 0xFF) + (value >> 8 & 0xFF) + (value & 0xFF),
+    "U": lambda value: (value >> 16 & 0xFF) + (value >> 8 & 0xFF) + (value & 0xFF),
+    "s": sum,
+    "a": sum,
+}
+
+
+# Modules defining the message classes, imported when a message class or the classifier is first needed
+_MESSAGE_MODULES = (
+    ".hapcanMessagesUART_Programming",
+    ".hapcanMessagesUART_System",
+    ".hapcanMessages_Programming",
+    ".hapcanMessages_System",
+)
+_messageModulesLoaded = False
+
+
+def _load_message_modules():
+    # Message classes register themselves with their dialect base class when their module is imported
+    global _messageModulesLoaded
+    if _messageModulesLoaded:
+        return False
+    _messageModulesLoaded = True
+    for module in _MESSAGE_MODULES:
+        importlib.import_module(module, __package__)
+    return True
+
+
+def _as_bytes(value):
+    # struct only packs bytes and bytearray into "s" fields
+    return value if isinstance(value, (bytes, bytearray)) else bytes(value)
+
+
+class HapcanMessageType(type):
+    """
+    Metaclass of all HAPCAN messages, gives every message class __slots__ for the fields declared in its LAYOUT.
+    Messages then carry no per-instance __dict__, which matters when millions of captured frames are held in memory.
+    """
+
+    def __new__(mcls, name, bases, namespace, **kwargs):
+        if "__slots__" not in namespace:
+            inherited = {slot for base in bases for k in base.__mro__ for slot in k.__dict__.get("__slots__", ())}
+            layout = namespace.get("LAYOUT") or ""
+            fields = [token.partition(":")[0] for token in layout.split() if not token.startswith("0x")]
+            namespace["__slots__"] = tuple(f for f in fields if f not in inherited)
+        return super().__new__(mcls, name, bases, namespace, **kwargs)
+
+
+    def __getattr__(cls, name):
+        # Only reached for missing class attributes, message classes like HapcanMessage.DATA_FRAME appear
+        # once their modules are loaded
+        if name[0] != "_" and _load_message_modules():
+            return getattr(cls, name)
+        raise AttributeError(f"type object '{cls.__name__}' has no attribute '{name}'")
 
 
 # Base class for all HAPCAN messages
-class HapcanMessage:
+class HapcanMessage(metaclass=HapcanMessageType):
 
+    __slots__ = ("_sender", "_rawFrame", "_encoded", "_lazy", "_frozen", "checksumValid")
     _message_type_subclasses = {}
+    _classifier = None # (dialect, frame length, FRAME_TYPE) -> message class, built on first use
+    _dialect = None # Dialect base class whose registry resolves frames, None means choose by frame length
     FRAME_TYPE = None
     FRAME_LENGTH = 15 # CAN frames are always 15 bytes long including header and trailer
+    LAYOUT = None # Frame bytes between FRAME_TYPE and CHKSUM as in doc/MessageTypes*.csv, e.g. "senderNode senderGroup hard:H 0xFF"
+    TARGET_NODE = None # Field holding the node a request is addressed to, used by HapcanEmulator routing
+    TARGET_GROUP = None # Field holding the addressed group, without TARGET_NODE a group request where 0 means all groups
+
+    # Compiled from LAYOUT by _compile_layout()
+    _fieldNames = ()
+    _layoutFields = ()
+    _simpleLayout = True
+    _encoder = None
+    _decoder = None
 
 
     def __init__(self, sender=None):
         self._sender = sender
+        self._encoded = None
 
 
     def __init_subclass__(cls, **kwargs):
@@ -18,8 +102,9 @@ class HapcanMessage:
         Used to register subclasses and their FRAME_TYPE values.
         """
 
-        # Skip the base class itself
+        # Skip the base class itself, dialect base classes resolve their own frames
         if cls.__name__.startswith("HapcanMessage"):
+            cls._dialect = cls
             return
         
 
@@ -28,68 +113,315 @@ class HapcanMessage:
             baseCls = cls.__bases__[0]
             ft = cls.FRAME_TYPE
 
+            if cls.LAYOUT is None:
+                raise ValueError(f"Subclass {cls.__name__} must define a LAYOUT class attribute.")
+            cls._compile_layout()
+            if baseCls.FRAME_LENGTH is not None and cls.FRAME_LENGTH != baseCls.FRAME_LENGTH:
+                raise ValueError(f"Subclass {cls.__name__} LAYOUT gives a {cls.FRAME_LENGTH} bytes long frame, expected {baseCls.FRAME_LENGTH}")
+
             # Store subclass in dispatch table
             baseCls._message_type_subclasses[ft] = cls
 
             # Make the subclass a parameter of the base class
             setattr(baseCls, cls.__name__, cls)
+
+            # Classifier has to be rebuilt to include the new subclass
+            HapcanMessage._classifier = None
         
         else:
             raise ValueError(f"Subclass {cls.__name__} must define a FRAME_TYPE class attribute.")
 
 
+    @classmethod
+    def _compile_layout(cls):
+        """
+        Compile the LAYOUT declaration into struct codecs covering the whole frame.
+        The encoder packs header, FRAME_TYPE, fields, constants, checksum and trailer in one call,
+        the decoder unpacks all integer fields in one call and skips everything else.
+        The checksum of FRAME_TYPE and the constant bytes is precomputed, only the field bytes are summed per frame.
+        __init__ and the encoder arguments are closures over the field list, see _layout_init() and _layout_encoder(),
+        a subclass defining its own __init__ must accept all fields positionally in LAYOUT order or override from_bytes.
+        """
+        encodeFormat = ">BH"
+        decodeFormat = ">3x"
+        template = [0xAA, cls.FRAME_TYPE] # Encoder arguments, None where a field value goes
+        constChecksum = (cls.FRAME_TYPE >> 8) + (cls.FRAME_TYPE & 0xFF)
+        layoutFields = []
+        encodeFields = []
+        decIndex = 0
+        offset = 3
+
+        for token in cls.LAYOUT.split():
+            if token.startswith("0x"):
+                # Constant byte
+                encodeFormat += "B"
+                decodeFormat += "x"
+                template.append(int(token, 16))
+                constChecksum += int(token, 16)
+                offset += 1
+                continue
+
+            name, _, code = token.partition(":")
+            code = code or "B"
+            kind = code[-1]
+            if not name.isidentifier() or kind not in _LAYOUT_ENCODE:
+                raise ValueError(f"Invalid field '{token}' in {cls.__name__}.LAYOUT")
+
+            if kind in "sa":
+                size = int(code[:-1])
+                encodeFormat += f"{size}s"
+                decodeFormat += f"{size}x"
+            else:
+                size = _LAYOUT_SIZE[kind]
+                encodeFormat += _LAYOUT_ENCODE[kind]
+                decodeFormat += _LAYOUT_DECODE[kind]
+
+            encodeFields.append((len(template), kind, size, _LAYOUT_CHECKSUM[kind]))
+            template += [None] * len(_LAYOUT_ENCODE[kind])
+            layoutFields.append((name, kind, size, decIndex, offset))
+            decIndex += len(_LAYOUT_DECODE[kind]) if kind not in "sa" else 0
+            offset += size
+
+        template += [constChecksum & 0xFF, 0xA5]
+        cls._encoder = struct.Struct(encodeFormat + "BB")
+        cls._decoder = struct.Struct(decodeFormat + "2x")
+        cls._layoutFields = tuple(layoutFields)
+        cls._fieldNames = tuple(f[0] for f in layoutFields)
+        cls._simpleLayout = all(f[1] in "BHI" for f in layoutFields)
+        cls.FRAME_LENGTH = cls._encoder.size
+
+        cls._encode_args = _layout_encoder(cls._fieldNames, template, tuple(encodeFields))
+        if "__init__" not in cls.__dict__:
+            cls.__init__ = _layout_init(cls, layoutFields)
+
+
+    @classmethod
+    def _decode_values(cls, data):
+        # Return the values of all fields of a frame of this class in LAYOUT order
+        values = cls._decoder.unpack_from(data)
+        if cls._simpleLayout:
+            return values
+
+        fields = []
+        for name, kind, size, decIndex, offset in cls._layoutFields:
+            if kind == "U":
+                value = values[decIndex] << 16 | values[decIndex + 1]
+            elif kind == "s":
+                value = data[offset:offset + size] # Zero-copy when data is a memoryview
+            elif kind == "a":
+                value = str(data[offset:offset + size], "ascii")
+            else:
+                value = values[decIndex]
+            fields.append(value)
+        return fields
+
+
     def to_bytes(self):
-        # If this is NOT an instance of HapcanMessage itself, complain
-        if type(self) is not HapcanMessage:
-            raise NotImplementedError(f"{self.__class__.__name__} must implement to_bytes()")
-        else:
-            return self._rawFrame
+        """
+        Return the encoded frame as bytes. It is encoded only once and cached until a field is set, so a message
+        broadcast to many devices costs one encode. Received frames with a valid checksum and generic messages
+        are not encoded again, a frame still held as a view of the receive buffer is copied once.
+        Use encode_into() to write the frame into a buffer without an intermediate copy.
+        Mutating a bytes-like field in place is not detected.
+        """
+        encoded = self._encoded
+        if encoded is None:
+            try:
+                encoded = self._encoder.pack(*self._encode_args())
+            except struct.error as e:
+                raise ValueError(f"{self.__class__.__name__}: {e}") from None
+            _set_encoded(self, encoded)
+        elif type(encoded) is not bytes:
+            encoded = bytes(encoded)
+            _set_encoded(self, encoded)
+        return encoded
+
+
+    def encode_into(self, buffer, offset=0):
+        """
+        Write the complete frame including checksum into a preallocated bytearray or writable memoryview.
+        Returns the offset just after the written frame, so consecutive frames can be packed into one buffer.
+        """
+        encoded = self._encoded
+        if encoded is not None:
+            end = offset + len(encoded)
+            if end > len(buffer):
+                # As pack_into below, a slice assignment would silently grow a bytearray instead
+                raise ValueError(f"{self.__class__.__name__}: encode_into requires a buffer of at least {end} bytes "
+                                 f"for packing {len(encoded)} bytes at offset {offset} (actual buffer size is {len(buffer)})")
+            buffer[offset:end] = encoded
+            return end
+
+        try:
+            self._encoder.pack_into(buffer, offset, *self._encode_args())
+        except struct.error as e:
+            raise ValueError(f"{self.__class__.__name__}: {e}") from None
+        return offset + self.FRAME_LENGTH
+
+
+    @staticmethod
+    def encode_all(messages) -> bytearray:
+        """
+        Encode a sequence of messages back to back into a single buffer, e.g. to send them with one write.
+        """
+        buffer = bytearray(sum(m.FRAME_LENGTH if m._encoded is None else len(m._encoded) for m in messages))
+        offset = 0
+        for m in messages:
+            offset = m.encode_into(buffer, offset)
+        return buffer
+
+
+    def __getattr__(self, name):
+        # Only reached for attributes which are not set, lazily created messages decode their fields on first access
+        if name in self._fieldNames and getattr(self, "_lazy", False):
+            self._decode()
+            return getattr(self, name)
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+
+    def __setattr__(self, name, value):
+        # Private attributes like _sender stay writable, fields of frozen messages do not
+        if name[0] != "_":
+            if getattr(self, "_frozen", False):
+                raise AttributeError(f"'{self.__class__.__name__}' object is frozen, cannot set '{name}'")
+            if name in self._fieldNames:
+                _set_encoded(self, None) # Cached frame is stale
+        object.__setattr__(self, name, value)
+
+
+    def __delattr__(self, name):
+        if name[0] != "_":
+            if getattr(self, "_frozen", False):
+                raise AttributeError(f"'{self.__class__.__name__}' object is frozen, cannot delete '{name}'")
+            if name in self._fieldNames:
+                _set_encoded(self, None)
+        object.__delattr__(self, name)
+
+
+    def freeze(self):
+        """
+        Make the fields of the message read-only and return it, e.g. to share one decoded message between consumers.
+        """
+        self._frozen = True
+        return self
+
+
+    def __eq__(self, other):
+        # Messages are equal when they encode to the same frame
+        if not isinstance(other, HapcanMessage):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
+
+
+    def __hash__(self):
+        # Hash of the frame bytes, a message must not be modified while it is used as a dict key (freeze it)
+        return hash(self.to_bytes())
+
+
+    def _decode(self):
+        # Decode all fields of a lazily created message from the memoryview of its raw frame
+        del self._lazy
+        for name, value in zip(self._fieldNames, self._decode_values(self._rawFrame)):
+            if not hasattr(self, name): # Fields set before the first access win
+                object.__setattr__(self, name, value)
 
 
     def __str__(self):
+        if getattr(self, "_lazy", False):
+            self._decode()
         s = self.__class__.__name__ + f": \r\n"
-        # Move 'checksumValid' to first position if it exists
-        items = list(self.__dict__.items())
-        items.sort(key=lambda kv: 0 if kv[0] == "checksumValid" else 1)
-        for k, v in items:
-            if k.startswith("_"): continue
+        # 'checksumValid' first, then the fields in LAYOUT order
+        for k in ("checksumValid",) + self._fieldNames:
+            if not hasattr(self, k): continue
+            v = getattr(self, k)
+            if isinstance(v, memoryview): v = bytearray(v) # Zero-copy fields of lazily decoded messages
             s += f"    {k}: {v}\r\n"
         return s
 
 
     @classmethod
-    def from_bytes(cls, data: bytearray):
-        # If this class is NOT HapcanMessage but a subclass,
-        # and it did not override from_bytes, then complain
-        if cls is not HapcanMessage:
-            # method was not overridden if cls.from_bytes is exactly this function
-            if cls.from_bytes is HapcanMessage.from_bytes:
-                raise NotImplementedError(
-                    f"{cls.__name__} must implement from_bytes()"
-                )
+    def from_bytes(cls, data: bytearray, lazy=False):
+        """
+        Decode a raw frame into an instance of the registered message class.
+        With lazy=True the message keeps a memoryview of data and decodes its fields only when one is first accessed,
+        the buffer must therefore not be modified or resized while the message is in use.
+        Otherwise a mutable data is copied, so a reused receive buffer does not change earlier messages.
+        """
+        # Registered subclasses decode their own frames with the compiled LAYOUT
+        if cls.FRAME_TYPE is not None:
+            return cls(*cls._decode_values(data))
 
         # Check if the frame starts and ends with correct bytes
         if data[0] != 0xAA or data[-1] != 0xA5:
             raise ValueError("Invalid frame")
         
-        frameType = cls._extract_FRAME_TYPE(data)
-        try:
-            subclass = cls._message_type_subclasses[frameType]
+        subclass = cls.classify(data)
+        if subclass.FRAME_TYPE is None:
+            # Frame type not registered, use the dialect base class
+            msg = subclass.__new__(subclass)
+            _set_sender(msg, None)
+        elif lazy:
+            # Skip __init__, fields are decoded from the raw frame on first access
+            data = memoryview(data)
+            msg = subclass.__new__(subclass)
+            _set_sender(msg, None)
+            _set_lazy(msg, True)
+        else:
             msg = subclass.from_bytes(data)
-        except KeyError:
-            # Frame type not registered, use base class
-            subclass = cls
-            msg = subclass()
-        msg._rawFrame = data
-        msg.checksumValid = cls._verify_checksum(data)
+        checksumValid = cls._verify_checksum(data)
+        if not lazy and type(data) is not bytes:
+            data = bytes(data)
+        _set_rawFrame(msg, data)
+        _set_checksumValid(msg, checksumValid)
+        # Re-send the received buffer instead of encoding the fields again, a registered message with a wrong
+        # checksum is re-encoded with the correct one, generic messages are always re-sent exactly as received
+        _set_encoded(msg, data if checksumValid or subclass.FRAME_TYPE is None else None)
         return msg
 
 
+    @staticmethod
+    def decode_many(buffer):
+        """
+        Decode a contiguous buffer of CAN frames into columnar NumPy arrays (frameType, senderNode, senderGroup,
+        data, checksum, frameValid, checksumValid), without creating a message object per frame.
+        Indexing the returned HapcanFrameBatch materialises the message of a single frame. Requires numpy.
+        """
+        from .hapcanBatch import HapcanFrameBatch # numpy is only needed for batch decoding
+        return HapcanFrameBatch(buffer)
+
+
+    @classmethod
+    def classify(cls, data: bytearray) -> type:
+        """
+        Return the message class for a raw frame with a single table lookup.
+        HapcanMessage resolves both dialects (CAN frames are FRAME_LENGTH long, anything else is UART),
+        HapcanMessageUART resolves UART frames only. Unregistered frame types resolve to the dialect base class.
+        """
+        classifier = HapcanMessage._classifier or HapcanMessage._build_classifier()
+        length = len(data)
+        dialect = cls._dialect
+        if dialect is None:
+            dialect = HapcanMessage if length == HapcanMessage.FRAME_LENGTH else HapcanMessageUART
+        return classifier.get((dialect, length, data[1] << 8 | data[2]), dialect)
+
+
+    @staticmethod
+    def _build_classifier():
+        _load_message_modules()
+        classifier = {}
+        for dialect in (HapcanMessage, HapcanMessageUART):
+            for frameType, subclass in dialect._message_type_subclasses.items():
+                classifier[(dialect, subclass.FRAME_LENGTH, frameType)] = subclass
+        HapcanMessage._classifier = classifier
+        return classifier
+
+
     # To be used when the message type should be different from defined ones
     @classmethod
     def raw_from_bytes(cls, data: bytearray):
         msg = cls()
         msg._rawFrame = data
+        msg._encoded = data
         msg.checksumValid = cls._verify_checksum(data)
         return msg
 
@@ -104,31 +436,155 @@ class HapcanMessage:
         return sum(data[1:-2]) & 0xFF == data[-2]
 
 
-    @staticmethod
-    def _append_checksum(data: bytearray):
-        checksum = sum(data) & 0xFF
-        data.append(checksum)
-        return data
-    
+# Direct slot setters for the decoding hot path, bypassing the frozen check in HapcanMessage.__setattr__
+_set_sender = HapcanMessage._sender.__set__
+_set_rawFrame = HapcanMessage._rawFrame.__set__
+_set_encoded = HapcanMessage._encoded.__set__
+_set_lazy = HapcanMessage._lazy.__set__
+_set_checksumValid = HapcanMessage.checksumValid.__set__
 
-    @staticmethod
-    def _append_header_trailer(data: bytearray):
-        data.insert(0, 0xAA)
-        data.append(0xA5)
-        return data
-    
 
-    @staticmethod
-    def _prepend_type(data: bytearray, frameType: int):
-        hi = (frameType >> 8) & 0xFF
-        lo = (frameType & 0xFF)
+def _layout_init(cls, layoutFields):
+    # __init__ of a message class taking its fields in LAYOUT order and then the sender,
+    # it stores the values directly into their slots, bypassing the frozen check in __setattr__
+    names = tuple(f[0] for f in layoutFields)
+    setters = tuple(getattr(cls, name).__set__ for name in names)
+    checks = tuple((i, name, kind, size) for i, (name, kind, size, _, _) in enumerate(layoutFields) if kind in "sa")
+    count = len(names)
+
+    def __init__(self, *args, **kwargs):
+        if kwargs or not count <= len(args) <= count + 1:
+            args = _bind_fields(type(self), names, args, kwargs)
+        if checks:
+            for i, name, kind, size in checks:
+                if kind == "s" and len(args[i]) != size:
+                    raise ValueError(f"{name} must be exactly {size} bytes long")
+                if kind == "a" and len(args[i]) > size:
+                    raise ValueError(f"{name} must be {size} characters or less")
+        _set_sender(self, args[count] if len(args) > count else None)
+        _set_encoded(self, None)
+        for setter, value in zip(setters, args):
+            setter(self, value)
 
-        data.insert(0, lo)
-        data.insert(0, hi)
-        return data
+    __init__.__qualname__ = f"{cls.__qualname__}.__init__"
+    __init__.__doc__ = f"{cls.__name__}({', '.join(names + ('sender=None',))})"
+    return __init__
+
+
+def _bind_fields(cls, names, args, kwargs):
+    # Slow path of the layout __init__ for fields given by keyword, returns the values in LAYOUT order and the sender
+    names += ("sender",)
+    if len(args) > len(names):
+        raise TypeError(f"{cls.__name__}() takes {len(names)} positional arguments but {len(args)} were given")
+    values = list(args)
+    for name in names[:len(args)]:
+        if name in kwargs:
+            raise TypeError(f"{cls.__name__}() got multiple values for argument '{name}'")
+    for name in names[len(args):]:
+        if name in kwargs:
+            values.append(kwargs.pop(name))
+        elif name == "sender":
+            values.append(None)
+        else:
+            raise TypeError(f"{cls.__name__}() missing required argument: '{name}'")
+    if kwargs:
+        raise TypeError(f"{cls.__name__}() got an unexpected keyword argument '{next(iter(kwargs))}'")
+    return values
+
+
+def _layout_encoder(names, template, encodeFields):
+    # Encoder arguments of a message class, the template with the field values filled in and the checksum added
+    if len(names) > 1:
+        values = operator.attrgetter(*names)
+    elif names:
+        getter = operator.attrgetter(names[0])
+        values = lambda self: (getter(self),)
+    else:
+        values = lambda self: ()
+
+    if all(kind in "BHI" for _, kind, _, _ in encodeFields):
+        # Integer fields only, the arguments are the field values, the checksum and the constants put in frame order
+        # by one itemgetter, wider fields are packed once more by a struct of the fields to sum their bytes
+        positions = [pos for pos, _, _, _ in encodeFields]
+        constants = [pos for pos, value in enumerate(template) if value is not None and pos != len(template) - 2]
+        order = [0] * len(template)
+        for i, pos in enumerate(positions + [len(template) - 2] + constants):
+            order[pos] = i
+        frameOrder = operator.itemgetter(*order)
+        constValues = tuple(template[pos] for pos in constants)
+        fieldStruct = struct.Struct(">" + "".join(kind for _, kind, _, _ in encodeFields))
+        byteSum = sum if fieldStruct.size == len(encodeFields) else lambda fields: sum(fieldStruct.pack(*fields))
+        constChecksum = template[-2]
+
+        def _encode_args(self):
+            fields = values(self)
+            return frameOrder(fields + ((constChecksum + byteSum(fields)) & 0xFF,) + constValues)
+
+        return _encode_args
+
+    def _encode_args(self):
+        args = template.copy()
+        checksum = args[-2]
+        for (pos, kind, size, byteSum), value in zip(encodeFields, values(self)):
+            if kind == "U":
+                args[pos] = value >> 16 & 0xFF
+                args[pos + 1] = value & 0xFFFF
+            elif kind == "s":
+                value = args[pos] = _as_bytes(value)[:size]
+            elif kind == "a":
+                value = args[pos] = value.encode("ascii")[:size]
+            else:
+                args[pos] = value
+            checksum += byteSum(value)
+        args[-2] = checksum & 0xFF
+        return args
+
+    return _encode_args
 
 
 class HapcanMessageUART(HapcanMessage):
     # Base class for UART messages
     _message_type_subclasses = {} # Separate dispatch table
-    FRAME_LENGTH = None # UART frames are never(?) 15 bytes long including header and trailer
\ No newline at end of file
+    FRAME_LENGTH = None # UART frames are never(?) 15 bytes long including header and trailer, each subclass gets it from its LAYOUT
+
+
+
+# Opt-in flyweight cache in front of HapcanMessage.from_bytes for the steady-state traffic of repeating frames
+class HapcanMessageCache:
+
+    def __init__(self, maxSize=256):
+        self.maxSize = maxSize
+        self._decode = functools.lru_cache(maxsize=maxSize)(self._decode_frozen)
+
+
+    @staticmethod
+    def _decode_frozen(frame: bytes):
+        return HapcanMessage.from_bytes(frame).freeze()
+
+
+    def from_bytes(self, data: bytearray) -> HapcanMessage:
+        """
+        Return the decoded message for a raw frame, shared with every other caller passing identical bytes.
+        The message is frozen, only private attributes like _sender may be set on it.
+        Invalid frames raise ValueError as with HapcanMessage.from_bytes and are not cached.
+        """
+        return self._decode(bytes(data))
+
+
+    @property
+    def hits(self):
+        return self._decode.cache_info().hits
+
+
+    @property
+    def misses(self):
+        return self._decode.cache_info().misses
+
+
+    def __len__(self):
+        return self._decode.cache_info().currsize
+
+
+    def clear(self):
+        # Drop all cached messages and reset the counters
+        self._decode.cache_clear()
@@ -5,25 +5,9 @@ from .hapcanMessage import HapcanMessage
 class ENTER_PROG_MODE_REQ(HapcanMessage):
     # 0xAA 0x100 0x0 MODUL GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x1000
-
-    def __init__(self, senderNode, senderGroup, reqNode, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqNode = reqNode
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqNode=data[7], reqGroup=data[8])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, self.reqNode, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
@@ -32,25 +16,7 @@ class ENTER_PROG_MODE_REQ(HapcanMessage):
 class ENTER_PROG_MODE_REQ_RESP(HapcanMessage):
     # 0xAA 0x100 0x1 MODULE GROUP 0xFF 0xFF BVER1 BVER2 0xFF 0xFF 0xFF 0xFF CHKSUM 0xA5
     FRAME_TYPE = 0x1001
-
-    def __init__(self, senderNode, senderGroup, bootVer, bootRev, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.bootVer = bootVer
-        self.bootRev = bootRev
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], bootVer=data[7], bootRev=data[8])
-        return msg
-
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, self.bootVer, self.bootRev, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF bootVer bootRev 0xFF 0xFF 0xFF 0xFF"
 
 
 #TBD    REBOOT_REQ_GROUP = 0x101
@@ -60,24 +26,8 @@ class ENTER_PROG_MODE_REQ_RESP(HapcanMessage):
 class HW_TYPE_REQ_GROUP(HapcanMessage):
     # 0xAA 0x103 0x0 MODUL GROUP 0xXX 0xXX 0x00 GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x1030
-
-    def __init__(self, senderNode, senderGroup, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqGroup=data[8])
-        return msg
-
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, 0x00, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF 0x00 reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) or (self.reqGroup == 0)
@@ -86,52 +36,15 @@ class HW_TYPE_REQ_GROUP(HapcanMessage):
 class HW_TYPE_REQ_GROUP_RESP(HapcanMessage):
     # 0xAA 0x103 0x1 MODULE GROUP HARD1 HARD2 HVER 0xFF ID0 ID1 ID2 ID3 CHKSUM 0xA5
     FRAME_TYPE = 0x1031
-
-    def __init__(self, senderNode, senderGroup, hard, hVer, serialNumber, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.hard = hard
-        self.hVer = hVer
-        self.serialNumber = serialNumber
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        sn = data[9]<<24 | data[10]<<16 | data[11]<<8 | data[12]
-        msg = cls(senderNode=data[3], senderGroup=data[4], hard=data[5]<<8 | data[6], hVer=data[7], serialNumber=sn)
-        return msg
-
-    def to_bytes(self):
-        sn = [(self.serialNumber>>24)&0xFF, (self.serialNumber>>16)&0xFF, (self.serialNumber>>8)&0xFF, self.serialNumber&0xFF]
-        data = bytearray([self.senderNode, self.senderGroup, self.hard>>8 & 0xFF, self.hard & 0xFF, self.hVer, 0xFF, *sn])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup hard:H hVer 0xFF serialNumber:I"
 
 
 class HW_TYPE_REQ_NODE(HapcanMessage):
     # 0xAA 0x104 0x0 MODUL GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x1040
-
-    def __init__(self, senderNode, senderGroup, reqNode, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqNode = reqNode
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqNode=data[7], reqGroup=data[8])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, self.reqNode, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
@@ -140,28 +53,7 @@ class HW_TYPE_REQ_NODE(HapcanMessage):
 class HW_TYPE_REQ_NODE_RESP(HapcanMessage):
     # 0xAA 0x104 0x1 MODULE GROUP HARD1 HARD2 HVER 0xFF ID0 ID1 ID2 ID3 CHKSUM 0xA5
     FRAME_TYPE = 0x1041
-
-    def __init__(self, senderNode, senderGroup, hard, hVer, serialNumber, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.hard = hard
-        self.hVer = hVer
-        self.serialNumber = serialNumber
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        sn = data[9]<<24 | data[10]<<16 | data[11]<<8 | data[12]
-        msg = cls(senderNode=data[3], senderGroup=data[4], hard=data[5]<<8 | data[6], hVer=data[7], serialNumber=sn)
-        return msg
-    
-    def to_bytes(self):
-        sn = [(self.serialNumber>>24)&0xFF, (self.serialNumber>>16)&0xFF, (self.serialNumber>>8)&0xFF, self.serialNumber&0xFF]
-        data = bytearray([self.senderNode, self.senderGroup, self.hard>>8 & 0xFF, self.hard & 0xFF, self.hVer, 0xFF, *sn])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup hard:H hVer 0xFF serialNumber:I"
     
     def isFor(self, device):
         return (self.senderGroup == device.groupId) and (self.senderNode == device.nodeId)
@@ -170,24 +62,8 @@ class HW_TYPE_REQ_NODE_RESP(HapcanMessage):
 class FW_TYPE_REQ_GROUP(HapcanMessage):
     # 0xAA 0x105 0x0 MODUL GROUP 0xXX 0xXX 0x00 GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x1050
-
-    def __init__(self, senderNode, senderGroup, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqGroup=data[8])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, 0x00, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF 0x00 reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) or (self.reqGroup == 0)
@@ -196,55 +72,15 @@ class FW_TYPE_REQ_GROUP(HapcanMessage):
 class FW_TYPE_REQ_GROUP_RESP(HapcanMessage):
     # 0xAA 0x105 0x1 MODULE GROUP HARD1 HARD2 HVER ATYPE AVERS FVERS BVER1 BREV2 CHKSUM 0xA5
     FRAME_TYPE = 0x1051
-
-    def __init__(self, senderNode, senderGroup, hard, hVer, aType, aVers, fVers, bootVer, bootRev, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.hard = hard
-        self.hVer = hVer
-        self.aType = aType
-        self.aVers = aVers
-        self.fVers = fVers
-        self.bootVer = bootVer
-        self.bootRev = bootRev
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], hard=data[5]<<8 | data[6], hVer=data[7], aType=data[8], aVers=data[9], fVers=data[10], bootVer=data[11], bootRev=data[12])
-        return msg
-
-    def to_bytes(self):
-        hard = [self.hard>>8 & 0xFF, self.hard & 0xFF]
-        data = bytearray([self.senderNode, self.senderGroup, *hard, self.hVer, self.aType, self.aVers, self.fVers, self.bootVer, self.bootRev])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup hard:H hVer aType aVers fVers bootVer bootRev"
 
 
 class FW_TYPE_REQ_NODE(HapcanMessage):
     #0xAA 0x106 0x0 MODULE GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x1060
-
-    def __init__(self, senderNode, senderGroup, reqNode, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqNode = reqNode
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqNode=data[7], reqGroup=data[8])
-        return msg
-
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, self.reqNode, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
@@ -253,32 +89,7 @@ class FW_TYPE_REQ_NODE(HapcanMessage):
 class FW_TYPE_REQ_NODE_RESP(HapcanMessage):
     #0xAA 0x106 0x1 MODULE GROUP HARD1 HARD2 HVER ATYPE AVERS FVERS BVER1 BREV2 CHKSUM 0xA5
     FRAME_TYPE = 0x1061
-
-    def __init__(self, senderNode, senderGroup, hard, hVer, aType, aVers, fVers, bootVer, bootRev, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.hard = hard
-        self.hVer = hVer
-        self.aType = aType
-        self.aVers = aVers
-        self.fVers = fVers
-        self.bootVer = bootVer
-        self.bootRev = bootRev
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], hard=data[5]<<8 | data[6],
-                  hVer=data[7], aType=data[8], aVers=data[9], fVers=data[10], bootVer=data[11], bootRev=data[12])
-        return msg
-    
-    def to_bytes(self):
-        hard = [self.hard>>8 & 0xFF, self.hard & 0xFF]
-        data = bytearray([self.senderNode, self.senderGroup, *hard, self.hVer, self.aType, self.aVers, self.fVers, self.bootVer, self.bootRev])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup hard:H hVer aType aVers fVers bootVer bootRev"
     
 
 #TBD    INCORRECT_FIRMWARE = 0x1F1
@@ -287,25 +98,9 @@ class FW_TYPE_REQ_NODE_RESP(HapcanMessage):
 class SET_DEFAULT_NODE_AND_GROUP_REQ(HapcanMessage):
     # 0xAA 0x107 0x0 MODUL GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x1070
-
-    def __init__(self, senderNode, senderGroup, reqNode, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqNode = reqNode
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqNode=data[7], reqGroup=data[8])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, self.reqNode, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
@@ -314,28 +109,30 @@ class SET_DEFAULT_NODE_AND_GROUP_REQ(HapcanMessage):
 class SET_DEFAULT_NODE_AND_GROUP_REQ_RESP(HapcanMessage):
     # 0xAA 0x107 0x1 ID2 ID3 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF CHKSUM 0xA5
     FRAME_TYPE = 0x1071
+    LAYOUT = "newNodeId newGroupId 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF"
 
-    def __init__(self, newNodeId, newGroupId, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.newNodeId = newNodeId
-        self.newGroupId = newGroupId
 
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(newNodeId=data[3], newGroupId=data[4])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.newNodeId, self.newGroupId]) + bytearray(b'\xFF\xFF\xFF\xFF\xFF\xFF\xFF\xFF')
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+########## Messages that can be handled by the functional firmware when bootloader is in normal mode ##########
+class STATUS_REQ_GROUP(HapcanMessage):
+    # 0xAA 0x108 0x0 MODUL GROUP 0xXX 0xXX 0x00 GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
+    FRAME_TYPE = 0x1080
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF 0x00 reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_GROUP = "reqGroup"
 
+    def isFor(self, device):
+        return (self.reqGroup == device.groupId) or (self.reqGroup == 0)
+
+
+class STATUS_REQ_NODE(HapcanMessage):
+    # 0xAA 0x109 0x0 MODUL GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
+    FRAME_TYPE = 0x1090
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
+
+    def isFor(self, device):
+        return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
 
-########## Messages that can be handled by the functional firmware when bootloader is in normal mode ##########
-#TBD    STATUS_REQ_GROUP = 0x108
-#TBD    STATUS_REQ_NODE = 0x109
 #TBD    CONTROL_MESSAGE = 0x10A
 ########## Messages that can be handled by the functional firmware when bootloader is in normal mode ##########
 
@@ -343,24 +140,8 @@ class SET_DEFAULT_NODE_AND_GROUP_REQ_RESP(HapcanMessage):
 class SUPPLY_VOLT_REQ_GROUP(HapcanMessage):
     # 0xAA 0x10B 0x0 MODUL GROUP 0xXX 0xXX 0x00 GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x10B0
-
-    def __init__(self, senderNode, senderGroup, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqGroup=data[8])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, 0x00, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF 0x00 reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) or (self.reqGroup == 0)
@@ -369,53 +150,15 @@ class SUPPLY_VOLT_REQ_GROUP(HapcanMessage):
 class SUPPLY_VOLT_REQ_GROUP_RESP(HapcanMessage):
     # 0xAA 0x10B 0x1 MODULE GROUP VOLBUS1 VOLBUS2 VOLCPU1 VOLCPU2 0xFF 0xFF 0xFF 0xFF CHKSUM 0xA5
     FRAME_TYPE = 0x10B1
-
-    def __init__(self, senderNode, senderGroup, rawVBus, rawVCpu, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.rawVBus = rawVBus
-        self.rawVCpu = rawVCpu
-    
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        rawVBus = data[5]<<8 | data[6]
-        rawVCpu = data[7]<<8 | data[8]
-        msg = cls(senderNode=data[3], senderGroup=data[4], rawVBus=rawVBus, rawVCpu=rawVCpu)
-        return msg
-    
-    def to_bytes(self):
-        rawVBus = [self.rawVBus>>8 & 0xFF, self.rawVBus & 0xFF]
-        rawVCpu = [self.rawVCpu>>8 & 0xFF, self.rawVCpu & 0xFF]
-        data = bytearray([self.senderNode, self.senderGroup, *rawVBus, *rawVCpu, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup rawVBus:H rawVCpu:H 0xFF 0xFF 0xFF 0xFF"
 
 
 class SUPPLY_VOLT_REQ_NODE(HapcanMessage):
     # 0xAA 0x10C 0x0 MODUL GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x10C0
-
-    def __init__(self, senderNode, senderGroup, reqNode, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqNode = reqNode
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqNode=data[7], reqGroup=data[8])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, self.reqNode, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
@@ -424,52 +167,14 @@ class SUPPLY_VOLT_REQ_NODE(HapcanMessage):
 class SUPPLY_VOLT_REQ_NODE_RESP(HapcanMessage):
     # 0xAA 0x10C 0x1 MODULE GROUP VOLBUS1 VOLBUS2 VOLCPU1 VOLCPU2 0xFF 0xFF 0xFF 0xFF CHKSUM 0xA5
     FRAME_TYPE = 0x10C1
-
-    def __init__(self, senderNode, senderGroup, rawVBus, rawVCpu, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.rawVBus = rawVBus
-        self.rawVCpu = rawVCpu
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        rawVBus = data[5]<<8 | data[6]
-        rawVCpu = data[7]<<8 | data[8]
-        msg = cls(senderNode=data[3], senderGroup=data[4], rawVBus=rawVBus, rawVCpu=rawVCpu)
-        return msg
-    
-    def to_bytes(self):
-        rawVBus = [self.rawVBus>>8 & 0xFF, self.rawVBus & 0xFF]
-        rawVCpu = [self.rawVCpu>>8 & 0xFF, self.rawVCpu & 0xFF]
-        data = bytearray([self.senderNode, self.senderGroup, *rawVBus, *rawVCpu, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup rawVBus:H rawVCpu:H 0xFF 0xFF 0xFF 0xFF"
 
 
 class DESC_REQ_GROUP(HapcanMessage):
     # 0xAA 0x10D 0x0 MODUL GROUP 0xXX 0xXX 0x00 GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x10D0
-
-    def __init__(self, senderNode, senderGroup, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqGroup=data[8])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, 0x00, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF 0x00 reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) or (self.reqGroup == 0)
@@ -478,52 +183,15 @@ class DESC_REQ_GROUP(HapcanMessage):
 class DESC_REQ_GROUP_RESP(HapcanMessage):
     # 0xAA 0x10D 0x1 MODULE GROUP abc0 abc1 abc2 abc3 abc4 abc5 abc6 abc7 CHKSUM 0xA5
     FRAME_TYPE = 0x10D1
-
-    def __init__(self, senderNode, senderGroup, desc, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if len(desc) > 8:
-            raise ValueError("Description string too long")
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.desc = desc
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        desc = data[5:13].decode('ascii')
-        msg = cls(senderNode=data[3], senderGroup=data[4], desc=desc)
-        return msg    
-        
-    def to_bytes(self):
-        data = self.desc.encode('ascii')
-        data = bytearray([self.senderNode, self.senderGroup]) + bytearray(data + b'\0'*(8-len(data))) # Make data exactly 8 bytes long
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup desc:8a"
 
 
 class DESC_REQ_NODE(HapcanMessage):
     # 0xAA 0x10E 0x0 MODULE GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
     FRAME_TYPE = 0x10E0
-
-    def __init__(self, senderNode, senderGroup, reqNode, reqGroup, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.reqNode = reqNode
-        self.reqGroup = reqGroup
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        msg = cls(senderNode=data[3], senderGroup=data[4], reqNode=data[7], reqGroup=data[8])
-        return msg
-    
-    def to_bytes(self):
-        data = bytearray([self.senderNode, self.senderGroup, 0xFF, 0xFF, self.reqNode, self.reqGroup, 0xFF, 0xFF, 0xFF, 0xFF])
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
     
     def isFor(self, device):
         return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
@@ -532,38 +200,84 @@ class DESC_REQ_NODE(HapcanMessage):
 class DESC_REQ_NODE_RESP(HapcanMessage):
     # 0xAA 0x10E 0x1 MODULE GROUP abc0 abc1 abc2 abc3 abc4 abc5 abc6 abc7 CHKSUM 0xA5
     FRAME_TYPE = 0x10E1
-
-    def __init__(self, senderNode, senderGroup, desc, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if len(desc) > 8:
-            raise ValueError("Description string too long")
-        self.senderNode = senderNode
-        self.senderGroup = senderGroup
-        self.desc = desc
-
-    @classmethod
-    def from_bytes(cls, data: bytearray):
-        desc = data[5:13].decode('ascii')
-        msg = cls(senderNode=data[3], senderGroup=data[4], desc=desc)
-        return msg    
-        
-    def to_bytes(self):
-        data = self.desc.encode('ascii')
-        data = bytearray([self.senderNode, self.senderGroup]) + bytearray(data + b'\0'*(8-len(data))) # Make data exactly 8 bytes long
-        self._prepend_type(data, self.FRAME_TYPE)
-        self._append_checksum(data)
-        self._append_header_trailer(data)
-        return data
+    LAYOUT = "senderNode senderGroup desc:8a"
 
 
 ########## Requests for the processors identification numbers written by Microchip
-#TBD    DEVID_REQ_GROUP = 0x10F
-#TBD    DEVID_REQ_NODE = 0x111
+class DEVID_REQ_GROUP(HapcanMessage):
+    # 0xAA 0x10F 0x0 MODULE GROUP 0xXX 0xXX 0x00 GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
+    FRAME_TYPE = 0x10F0
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF 0x00 reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_GROUP = "reqGroup"
+
+    def isFor(self, device):
+        return (self.reqGroup == device.groupId) or (self.reqGroup == 0)
+
+
+class DEVID_REQ_GROUP_RESP(HapcanMessage):
+    # 0xAA 0x10F 0x1 MODULE GROUP DEVID1 DEVID2 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF CHKSUM 0xA5
+    FRAME_TYPE = 0x10F1
+    LAYOUT = "senderNode senderGroup devId1 devId2 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF"
+
+
+class DEVID_REQ_NODE(HapcanMessage):
+    # 0xAA 0x111 0x0 MODULE GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
+    FRAME_TYPE = 0x1110
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
+
+    def isFor(self, device):
+        return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
+
+
+class DEVID_REQ_NODE_RESP(HapcanMessage):
+    # 0xAA 0x111 0x1 MODULE GROUP DEVID1 DEVID2 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF CHKSUM 0xA5
+    FRAME_TYPE = 0x1111
+    LAYOUT = "senderNode senderGroup devId1 devId2 0xFF 0xFF 0xFF 0xFF 0xFF 0xFF"
+
 
+########## Messages that can be handled by the functional firmware when bootloader is in normal mode ##########
+class UPTIME_REQ_GROUP(HapcanMessage):
+    # 0xAA 0x112 0x0 MODULE GROUP 0xXX 0xXX 0x00 GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
+    FRAME_TYPE = 0x1120
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF 0x00 reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_GROUP = "reqGroup"
+
+    def isFor(self, device):
+        return (self.reqGroup == device.groupId) or (self.reqGroup == 0)
+
+
+class UPTIME_REQ_NODE(HapcanMessage):
+    # 0xAA 0x113 0x0 MODULE GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
+    FRAME_TYPE = 0x1130
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
+
+    def isFor(self, device):
+        return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
+
+
+class HEALTH_REQ_GROUP(HapcanMessage):
+    # 0xAA 0x114 0x0 MODULE GROUP 0xXX 0xXX 0x00 GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
+    FRAME_TYPE = 0x1140
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF 0x00 reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_GROUP = "reqGroup"
+
+    def isFor(self, device):
+        return (self.reqGroup == device.groupId) or (self.reqGroup == 0)
+
+
+class HEALTH_REQ_NODE(HapcanMessage):
+    # 0xAA 0x115 0x0 MODULE GROUP 0xXX 0xXX MODULE GROUP 0xXX 0xXX 0xXX 0xXX CHKSUM 0xA5
+    FRAME_TYPE = 0x1150
+    LAYOUT = "senderNode senderGroup 0xFF 0xFF reqNode reqGroup 0xFF 0xFF 0xFF 0xFF"
+    TARGET_NODE = "reqNode"
+    TARGET_GROUP = "reqGroup"
+
+    def isFor(self, device):
+        return (self.reqGroup == device.groupId) and (self.reqNode == device.nodeId)
 
+#TBD    UPTIME_REQ_GROUP_RESP, UPTIME_REQ_NODE_RESP, HEALTH_REQ_GROUP_RESP, HEALTH_REQ_NODE_RESP - response layouts are not documented in doc/MessageTypesCAN-System.csv yet
 ########## Messages that can be handled by the functional firmware when bootloader is in normal mode ##########
-#TBD    UPTIME_REQ_GROUP = 0x112
-#TBD    UPTIME_REQ_NODE = 0x113
-#TBD    HEALTH_REQ_GROUP = 0x114
-#TBD    HEALTH_REQ_NODE = 0x115
-########## Messages that can be handled by the functional firmware when bootloader is in normal mode ##########
\ No newline at end of file
@@ -0,0 +1,183 @@
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("Loading topologies requires numpy, install it with 'pip install numpy'") from e
+
+import csv
+import inspect
+import json
+import os
+from itertools import repeat
+
+from .hapcanDevice import HapcanDevice
+from .hapcanMemory import MemoryField, MemoryImage
+
+
+
+class HapcanTopology:
+    """
+    Description of an emulated network, one entry per device, loaded from a JSON or CSV file.
+    All entries are validated at once before any device is created, so every mistake, including node/group
+    assignments used more than once, is reported together. createDevices() then builds the whole network
+    without the per-device validation and field writes of HapcanDevice.__init__.
+    """
+
+    # Short column names accepted in files -> HapcanDevice constructor argument
+    ALIASES = {"node": "nodeId", "group": "groupId", "serial": "serialNumber", "type": "aType", "image": "memoryImage"}
+
+    # Integer columns and their largest value, the others are description and memoryImage
+    INT_COLUMNS = {
+        "nodeId": 0xFF, "groupId": 0xFF, "serialNumber": 0xFFFFFFFF, "aType": 0xFF,
+        "hard": 0xFFFF, "hVer": 0xFF, "aVers": 0xFF, "fVers": 0xFF, "bootVer": 0xFF, "bootRev": 0xFF,
+        "rawVBus": 0xFFFF, "rawVCpu": 0xFFFF,
+    }
+    REQUIRED = ("nodeId", "groupId", "serialNumber", "aType")
+
+
+    def __init__(self, entries):
+        # entries is a list of dicts keyed by constructor argument or alias
+        self.entries = [{self.ALIASES.get(key, key): value for key, value in entry.items()} for entry in entries]
+        self.columns = {} # Constructor argument -> numpy array or list with one value per entry, set by validate()
+
+
+    @classmethod
+    def from_file(cls, path) -> "HapcanTopology":
+        # JSON is a list of objects or an object with a "devices" list, CSV has a header row naming the columns
+        with open(path, newline="") as f:
+            if os.path.splitext(path)[1].lower() == ".json":
+                entries = json.load(f)
+                if isinstance(entries, dict):
+                    entries = entries["devices"]
+            else:
+                entries = [{key: value for key, value in row.items() if value not in (None, "")} for row in csv.DictReader(f)]
+        return cls(entries)
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def validate(self):
+        """
+        Check all entries column by column and raise a ValueError listing every problem found.
+        """
+        defaults = {name: p.default for name, p in inspect.signature(HapcanDevice.__init__).parameters.items()
+                    if p.default is not inspect.Parameter.empty}
+        problems = []
+        count = len(self.entries)
+
+        for name, limit in self.INT_COLUMNS.items():
+            raw = [entry.get(name, defaults.get(name)) for entry in self.entries]
+            try:
+                # Whole column at once, all values are integers or, as in CSV files, all are strings e.g. "0x01234567"
+                values = map(int, raw, repeat(0)) if raw and isinstance(raw[0], str) else raw
+                column = np.fromiter(values, dtype=np.int64, count=count)
+            except (TypeError, ValueError, OverflowError):
+                column = self._parseColumn(name, limit, raw, problems)
+            bad = np.flatnonzero((column < 0) | (column > limit))
+            problems.extend(f"entry {i}: {name} must be in range 0–{limit}, got {raw[i]}" for i in bad)
+            self.columns[name] = column
+
+        descriptions = [entry.get("description", defaults["description"]) for entry in self.entries]
+        for i, text in enumerate(descriptions):
+            if not isinstance(text, str) or len(text) > 16:
+                problems.append(f"entry {i}: description must be a string of 16 characters or less, got {text!r}")
+        self.columns["description"] = descriptions
+        self.columns["memoryImage"] = [entry.get("memoryImage") for entry in self.entries]
+
+        for name in self.REQUIRED:
+            problems.extend(f"entry {i}: {name} is missing" for i, entry in enumerate(self.entries) if name not in entry)
+
+        # Node/group assignments used more than once
+        keys, inverse, counts = np.unique(self.columns["groupId"] << 8 | self.columns["nodeId"], return_inverse=True, return_counts=True)
+        for k in np.flatnonzero(counts > 1):
+            rows = np.flatnonzero(inverse == k).tolist()
+            problems.append(f"entries {rows}: node {keys[k] & 0xFF} group {keys[k] >> 8} is assigned more than once")
+
+        if problems:
+            raise ValueError(f"Invalid topology, {len(problems)} problem(s):\n" + "\n".join(problems))
+
+
+    @staticmethod
+    def _parseColumn(name, limit, raw, problems):
+        # Value by value, only for columns with missing or invalid values, to report each of them
+        values = []
+        for i, value in enumerate(raw):
+            # Missing required values are reported by validate()
+            try:
+                value = 0 if value is None else int(value, 0) if isinstance(value, str) else int(value)
+            except (TypeError, ValueError):
+                problems.append(f"entry {i}: {name} must be an integer (0–{limit}), got {value!r}")
+                value = 0
+            values.append(min(value, limit + 1))
+        return np.array(values, dtype=np.int64)
+
+
+    def _initialPages(self, deviceClass, pageSizes) -> dict:
+        # Initial content of the memory pages holding MemoryFields, built column by column for all devices at once,
+        # region -> {page index: bytes of that page of every device one after another}, other bytes are erased (0xFF)
+        regions = {region.name: region for region in deviceClass.MEMORY_REGIONS}
+        pages = {name: {} for name in regions}
+        count = len(self.entries)
+        for name, column in self.columns.items():
+            field = getattr(deviceClass, name, None)
+            if not isinstance(field, MemoryField):
+                continue
+            if field.dtype == int:
+                rows = (column[:, None] >> np.arange(8 * (field.size - 1), -1, -8)).astype(np.uint8)
+            else:
+                rows = np.frombuffer(b"".join(text.encode("ascii", errors="ignore")[:field.size].ljust(field.size, b"\x00")
+                                              for text in column), dtype=np.uint8).reshape(-1, field.size)
+            offset = field.address - regions[field.region].base_address
+            for pos in range(field.size):
+                page, start = divmod(offset + pos, pageSizes[field.region])
+                block = pages[field.region].get(page)
+                if block is None:
+                    block = pages[field.region][page] = np.full((count, pageSizes[field.region]), 0xFF, dtype=np.uint8)
+                block[:, start] = rows[:, pos]
+        return {region: {page: block.tobytes() for page, block in blocks.items()} for region, blocks in pages.items() if blocks}
+
+
+    def createDevices(self, emulator, deviceClass=HapcanDevice) -> list:
+        """
+        Validate the topology and add all its devices to the emulator.
+        Entries sharing a memory image path are packed into one image file in the order of the entries.
+        Device classes with a constructor of their own are still created through it, after validation.
+        """
+        self.validate()
+        memorySize = sum(region.size for region in deviceClass.MEMORY_REGIONS)
+        images = {}
+        for path in self.columns["memoryImage"]:
+            if path is not None:
+                images[path] = images.get(path, 0) + memorySize
+        images = {path: MemoryImage(path, size) for path, size in images.items()}
+
+        devices = []
+        if deviceClass.__init__ is not HapcanDevice.__init__:
+            for i, entry in enumerate(self.entries):
+                kwargs = {name: self.columns[name][i] for name in entry if name in self.INT_COLUMNS}
+                kwargs = {name: int(value) for name, value in kwargs.items()}
+                kwargs["description"] = self.columns["description"][i]
+                kwargs["memoryImage"] = images.get(entry.get("memoryImage"))
+                devices.append(deviceClass(emulator, **kwargs))
+        else:
+            new = []
+            for path in self.columns["memoryImage"]:
+                device = deviceClass.__new__(deviceClass)
+                new.append(device._initState(emulator, images.get(path)))
+                devices.append(device)
+            pageSizes = {region.name: getattr(devices[0], region.name).page_size for region in deviceClass.MEMORY_REGIONS} if devices else {}
+            pages = self._initialPages(deviceClass, pageSizes)
+            rawVBus = self.columns["rawVBus"].tolist()
+            rawVCpu = self.columns["rawVCpu"].tolist()
+            for i, device in enumerate(devices):
+                if new[i]:
+                    for region, regionPages in pages.items():
+                        size = pageSizes[region]
+                        getattr(device, region).load_pages({page: data[i*size:(i+1)*size] for page, data in regionPages.items()})
+                device.rawVBus = rawVBus[i]
+                device.rawVCpu = rawVCpu[i]
+
+        for device in devices:
+            emulator.addDevice(device)
+        return devices
@@ -0,0 +1,67 @@
+from pyHAPCAN import HapcanDevice, HapcanEmulator, HapcanMessage
+from pyHAPCAN.hapcanDevice import AcceptanceFilter
+
+
+def frame(frameType, node=1, group=1):
+    data = bytearray([0xAA, frameType >> 8, frameType & 0xFF, node, group, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0xA5])
+    data[-2] = sum(data[1:-2]) & 0xFF
+    return HapcanMessage.from_bytes(bytes(data))
+
+
+class Filtered(HapcanDevice):
+    ACCEPTANCE_FILTERS = (AcceptanceFilter(0x3000, frameTypeMask=0xFFF0),)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = []
+
+    def processCanApplicationMessage(self, m):
+        data = m.to_bytes()
+        self.received.append(data[1] << 8 | data[2])
+
+
+def makeNetwork():
+    emulator = HapcanEmulator()
+    sender = emulator.createDevice(HapcanDevice, nodeId=1, groupId=1, serialNumber=1, aType=0)
+    devices = [emulator.createDevice(Filtered, nodeId=n, groupId=2, serialNumber=n, aType=0) for n in (2, 3)]
+    return emulator, sender, devices
+
+
+def send(sender, *frameTypes, **address):
+    for frameType in frameTypes:
+        sender.sendCanMessage(frame(frameType, **address))
+
+
+def test_class_filters():
+    emulator, sender, devices = makeNetwork()
+    send(sender, 0x3001, 0x3100, 0x300F)
+    assert devices[0].received == devices[1].received == [0x3001, 0x300F]
+
+
+def test_set_filters_affects_one_device_only():
+    emulator, sender, devices = makeNetwork()
+    devices[0].setAcceptanceFilters(AcceptanceFilter(0x3100))
+    send(sender, 0x3001, 0x3100)
+    assert devices[0].received == [0x3100]
+    assert devices[1].received == [0x3001]
+    assert Filtered.ACCEPTANCE_FILTERS[0].frameType == 0x3000
+    # Devices created later still get the class filters
+    later = emulator.createDevice(Filtered, nodeId=4, groupId=2, serialNumber=4, aType=0)
+    send(sender, 0x3002, 0x3100)
+    assert later.received == [0x3002]
+
+
+def test_set_no_filters_receives_all():
+    emulator, sender, devices = makeNetwork()
+    devices[0].setAcceptanceFilters()
+    send(sender, 0x3001, 0x3100)
+    assert devices[0].received == [0x3001, 0x3100]
+
+
+def test_address_filter():
+    emulator, sender, devices = makeNetwork()
+    devices[0].setAcceptanceFilters(AcceptanceFilter(0x3000, node=0x10, nodeMask=0xF0, group=7, groupMask=0xFF))
+    send(sender, 0x3000, node=0x12, group=7)
+    send(sender, 0x3000, node=0x22, group=7)
+    send(sender, 0x3000, node=0x12, group=8)
+    assert devices[0].received == [0x3000]
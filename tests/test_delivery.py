@@ -0,0 +1,73 @@
+import pytest
+
+from pyHAPCAN import HapcanDevice, HapcanEmulator, HapcanMessage
+
+
+def frame(n):
+    # Distinct generic frames of an unregistered frame type, delivered to every device receiving all frames
+    data = bytearray([0xAA, 0x30, 0x00, n, 0x01, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0xA5])
+    data[-2] = sum(data[1:-2]) & 0xFF
+    return HapcanMessage.from_bytes(bytes(data))
+
+
+class Recorder(HapcanDevice):
+    # Records the frames it receives and answers some of them with further frames while they are delivered
+    def __init__(self, *args, replies=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = []
+        self.replies = replies or {} # Received frame number -> frame numbers sent in response
+
+    def processCanApplicationMessage(self, m):
+        n = m.to_bytes()[3]
+        self.received.append(n)
+        for reply in self.replies.get(n, ()):
+            self.sendCanMessage(frame(reply))
+
+
+def makeNetwork(**kwargs):
+    emulator = HapcanEmulator(**kwargs)
+    sender = emulator.createDevice(Recorder, nodeId=1, groupId=1, serialNumber=1, aType=0)
+    return emulator, sender
+
+
+def test_reentrant_broadcast_is_delivered_in_fifo_order():
+    emulator, sender = makeNetwork()
+    forwarder = emulator.createDevice(Recorder, nodeId=2, groupId=1, serialNumber=2, aType=0, replies={1: (2, 3)})
+    last = emulator.createDevice(Recorder, nodeId=3, groupId=1, serialNumber=3, aType=0)
+    sender.sendCanMessage(frame(1))
+    # Frame 1 reaches every device before the frames sent while it was delivered
+    assert last.received == [1, 2, 3]
+    assert sender.received == [2, 3]
+    assert forwarder.received == [1]
+
+
+def queueFull(policy):
+    # A network whose queue holds one frame, frame 1 makes the forwarder send frames 2, 3 and 4 at once
+    emulator, sender = makeNetwork(maxQueueDepth=1, overflowPolicy=policy)
+    forwarder = emulator.createDevice(Recorder, nodeId=2, groupId=1, serialNumber=2, aType=0, replies={1: (2, 3, 4)})
+    last = emulator.createDevice(Recorder, nodeId=3, groupId=1, serialNumber=3, aType=0)
+    return emulator, sender, forwarder, last
+
+
+def test_overflow_drop_newest():
+    emulator, sender, forwarder, last = queueFull(HapcanEmulator.OVERFLOW.DROP_NEWEST)
+    sender.sendCanMessage(frame(1))
+    assert last.received == [1, 2]
+    assert emulator.sourceStats[forwarder].sent == 3
+    assert emulator.sourceStats[forwarder].dropped == 2
+
+
+def test_overflow_drop_oldest():
+    emulator, sender, forwarder, last = queueFull(HapcanEmulator.OVERFLOW.DROP_OLDEST)
+    sender.sendCanMessage(frame(1))
+    assert last.received == [1, 4]
+    assert emulator.sourceStats[forwarder].dropped == 2
+
+
+def test_overflow_raise():
+    emulator, sender, forwarder, last = queueFull(HapcanEmulator.OVERFLOW.RAISE)
+    with pytest.raises(OverflowError):
+        sender.sendCanMessage(frame(1))
+    # The queue is cleared, later frames are delivered normally
+    sender.sendCanMessage(frame(5))
+    assert last.received[-1] == 5
@@ -0,0 +1,84 @@
+import pytest
+
+from pyHAPCAN.hapcanMemory import FlashMemory, Memory
+
+
+def test_unwritten_memory_reads_erased():
+    mem = Memory(0x400, base_address=0xF00000)
+    assert mem.read(0xF00000, 4) == b"\xFF" * 4
+    assert mem.data == b"\xFF" * 0x400
+    assert not mem._pages
+
+
+def test_write_across_pages():
+    mem = Memory(0x400)
+    mem.write(0x3E, b"\x01\x02\x03\x04")
+    assert mem.read(0x3C, 8) == b"\xFF\xFF\x01\x02\x03\x04\xFF\xFF"
+    assert sorted(mem._pages) == [0, 1]
+
+
+def test_data_is_read_only():
+    mem = Memory(0x400)
+    with pytest.raises(TypeError):
+        mem.data[0] = 0x00
+    assert mem.read(0, 1) == b"\xFF"
+
+
+def test_read_returns_copy():
+    mem = Memory(0x400)
+    mem.write(0x10, b"\x01\x02")
+    data = mem.read(0x10, 2)
+    data[0] = 0x55
+    assert mem.read(0x10, 2) == b"\x01\x02"
+
+
+def test_copy_shares_pages_until_written():
+    mem = Memory(0x400)
+    mem.write(0x10, b"\x01\x02")
+    clone = mem.copy()
+    assert clone._pages[0] is mem._pages[0]
+    clone.write(0x10, b"\x03")
+    assert clone.read(0x10, 2) == b"\x03\x02"
+    assert mem.read(0x10, 2) == b"\x01\x02"
+
+
+def test_deduplicate_identical_pages():
+    memories = [Memory(0x400) for _ in range(3)]
+    for mem in memories:
+        mem.write(0x80, b"same")
+    memories[2].write(0x00, b"other")
+    assert Memory.deduplicate(memories) == 2
+    assert memories[0]._pages[2] is memories[1]._pages[2] is memories[2]._pages[2]
+
+
+def test_flash_write_clears_bits_only():
+    flash = FlashMemory(0x1000)
+    flash.write(0x40, b"\x0F\xF0")
+    flash.write(0x40, b"\x0E\x00")
+    assert flash.read(0x40, 2) == b"\x0E\x00"
+
+
+def test_flash_write_setting_bit_is_rejected():
+    flash = FlashMemory(0x1000)
+    flash.write(0x40, b"\x00\x00\x00")
+    with pytest.raises(Exception, match="requires erase at 65"):
+        flash.write(0x40, b"\x00\x01\x00")
+    assert flash.read(0x40, 3) == b"\x00\x00\x00" # Nothing written
+
+
+def test_flash_write_across_pages_is_checked_before_writing():
+    flash = FlashMemory(0x1000)
+    flash.write(0x7F, b"\x00")
+    with pytest.raises(Exception, match="requires erase at 127"):
+        flash.write(0x3F, bytes(64) + b"\x01")
+    assert flash.read(0x3F, 1) == b"\xFF"
+
+
+def test_flash_erase_page():
+    flash = FlashMemory(0x1000)
+    flash.write(0x40, bytes(64))
+    flash.erase_page(0x40)
+    assert flash.read(0x40, 64) == b"\xFF" * 64
+    flash.write(0x40, b"\x12")
+    with pytest.raises(ValueError):
+        flash.erase_page(0x41)
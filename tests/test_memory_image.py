@@ -0,0 +1,60 @@
+import pytest
+
+from pyHAPCAN import HapcanDevice, HapcanEmulator
+from pyHAPCAN.hapcanMemory import MemoryImage
+
+
+MEMORY_SIZE = sum(region.size for region in HapcanDevice.MEMORY_REGIONS)
+
+
+def createNetwork(path, count=3):
+    emulator = HapcanEmulator(memoryImage=MemoryImage(path, count * MEMORY_SIZE))
+    devices = [emulator.createDevice(HapcanDevice, nodeId=n + 1, groupId=1, serialNumber=n, aType=0, description=f"dev{n}")
+               for n in range(count)]
+    return emulator, devices
+
+
+def test_memories_persist_across_reopen(tmp_path):
+    path = tmp_path / "network.img"
+    emulator, devices = createNetwork(path)
+    devices[1].nodeId = 42
+    devices[1].description = "changed"
+    devices[2].flash.erase_page(0x40)
+    devices[2].flash.write(0x40, b"\x12\x34")
+    emulator.close()
+    assert path.stat().st_size == 3 * MEMORY_SIZE
+
+    # Initial values given to the constructors do not overwrite the stored memories
+    emulator, devices = createNetwork(path)
+    assert [d.nodeId for d in devices] == [1, 42, 3]
+    assert devices[1].description == "changed"
+    assert devices[2].flash.read(0x40, 2) == b"\x12\x34"
+    assert devices[0].flash.read(0x40, 2) == b"\xFF\xFF"
+    emulator.close()
+
+
+def test_close_releases_memories(tmp_path):
+    emulator, devices = createNetwork(tmp_path / "network.img")
+    emulator.close()
+    assert emulator.memoryImage.closed
+    with pytest.raises(ValueError):
+        devices[0].flash.read(0x40, 2)
+    with pytest.raises(ValueError):
+        emulator.memoryImage.allocate(MEMORY_SIZE)
+
+
+def test_context_manager_flushes_and_closes(tmp_path):
+    path = tmp_path / "device.img"
+    with MemoryImage(path) as image:
+        view, new = image.allocate(16)
+        assert new
+        view[:4] = b"HAPC"
+        view.release()
+    assert image.closed
+    assert path.read_bytes() == b"HAPC" + b"\xFF" * 12
+
+    with MemoryImage(path) as image:
+        view, new = image.allocate(16)
+        assert not new
+        assert bytes(view[:4]) == b"HAPC"
+        view.release()
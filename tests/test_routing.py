@@ -0,0 +1,58 @@
+from pyHAPCAN import HapcanDevice, HapcanEmulator, HapcanMessage
+
+
+class Probe(HapcanDevice):
+    # Receives every frame, records the responses of the other devices
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = []
+
+    def processCanApplicationMessage(self, m):
+        self.received.append(m)
+
+
+def makeNetwork():
+    emulator = HapcanEmulator()
+    probe = emulator.createDevice(Probe, nodeId=250, groupId=250, serialNumber=0xFFFF, aType=0)
+    devices = [emulator.createDevice(HapcanDevice, nodeId=n, groupId=1, serialNumber=n, aType=0) for n in (1, 2)]
+    return emulator, probe, devices
+
+
+def respondents(probe, node, group):
+    # Serial numbers of the devices answering a hardware type request addressed to node/group
+    probe.received.clear()
+    probe.sendCanMessage(HapcanMessage.HW_TYPE_REQ_NODE(probe.nodeId, probe.groupId, node, group))
+    return [m.serialNumber for m in probe.received if isinstance(m, HapcanMessage.HW_TYPE_REQ_NODE_RESP)]
+
+
+def test_request_reaches_addressed_device_only():
+    emulator, probe, devices = makeNetwork()
+    assert respondents(probe, 1, 1) == [1]
+    assert respondents(probe, 2, 1) == [2]
+    assert respondents(probe, 3, 1) == []
+
+
+def test_route_follows_node_id_change():
+    emulator, probe, devices = makeNetwork()
+    devices[0].nodeId = 7
+    assert respondents(probe, 1, 1) == []
+    assert respondents(probe, 7, 1) == [1]
+
+
+def test_route_follows_group_id_memory_write():
+    emulator, probe, devices = makeNetwork()
+    field = type(devices[1]).groupId
+    getattr(devices[1], field.region).write(field.address, b"\x09")
+    assert respondents(probe, 2, 1) == []
+    assert respondents(probe, 2, 9) == [2]
+
+
+def test_route_follows_restore():
+    emulator, probe, devices = makeNetwork()
+    emulator.snapshot()
+    devices[0].nodeId = 7
+    devices[1].groupId = 9
+    emulator.restore()
+    assert respondents(probe, 1, 1) == [1]
+    assert respondents(probe, 2, 1) == [2]
+    assert respondents(probe, 7, 1) == []
@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pyHAPCAN.hapcanBatch import scan_frames
+
+
+def frame(node, frameType=0x3000):
+    out = bytearray([0xAA, frameType >> 8, frameType & 0xFF, node, 0x01, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0xA5])
+    out[-2] = sum(out[1:-2]) & 0xFF
+    return bytes(out)
+
+
+def badChecksum(node):
+    out = bytearray(frame(node))
+    out[-2] ^= 0xFF
+    return bytes(out)
+
+
+def test_clean_stream():
+    buffer = frame(1) + frame(2) + frame(3)
+    scan = scan_frames(buffer)
+    assert scan.offsets.tolist() == [0, 15, 30]
+    assert scan.lengths.tolist() == [15, 15, 15]
+    assert len(scan.badChecksum) == 0
+    assert len(scan.gaps) == 0
+
+
+def test_garbage_bad_checksum_and_truncated_frame():
+    garbage = b"\x01\xAA\x02\xA5\x03"
+    buffer = garbage + frame(1) + badChecksum(2) + frame(3) + frame(4)[:9]
+    scan = scan_frames(buffer)
+    assert len(scan) == 2
+    assert scan.offsets.tolist() == [5, 35]
+    assert scan.badChecksum.tolist() == [20]
+    assert scan.gaps.tolist() == [[0, 5], [20, 35], [50, 59]]
+
+
+def test_false_frame_across_valid_frames_is_ignored():
+    # The node byte 0xAA of the first frame and the frame type byte 0xA5 of the second look like another frame
+    buffer = frame(0xAA) + frame(2, frameType=0x30A5)
+    scan = scan_frames(buffer)
+    assert scan.offsets.tolist() == [0, 15]
+    assert len(scan.badChecksum) == 0
+    assert len(scan.gaps) == 0
+
+
+def test_batch_of_valid_frames():
+    buffer = b"\x00" + frame(1) + badChecksum(2) + frame(3)
+    batch = scan_frames(buffer).batch()
+    assert len(batch) == 2
+    assert batch.senderNode.tolist() == [1, 3]
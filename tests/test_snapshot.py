@@ -0,0 +1,59 @@
+import pytest
+
+from pyHAPCAN import HapcanDevice, HapcanEmulator
+from pyHAPCAN.hapcanMemory import FlashMemory, Memory
+
+
+def contents(device):
+    return [mem.data for mem in device.memory]
+
+
+def test_memory_restore_puts_back_modified_pages_only():
+    mem = Memory(0x400)
+    mem.write(0x00, b"\x01")
+    mem.snapshot()
+    mem.write(0x00, b"\x02")
+    mem.write(0x100, b"\x03")
+    mem.erase_range(0x40, 0x40)
+    assert mem.dirtyPages == {0, 1, 4}
+    mem.restore()
+    assert mem.read(0x00, 1) == b"\x01"
+    assert mem.read(0x100, 1) == b"\xFF"
+    assert mem.dirtyPages == set()
+
+
+def test_flash_restore_after_erase():
+    flash = FlashMemory(0x1000)
+    flash.write(0x40, b"\x00\x11")
+    flash.snapshot()
+    flash.erase_page(0x40)
+    flash.write(0x40, b"\x22")
+    flash.restore()
+    assert flash.read(0x40, 2) == b"\x00\x11"
+
+
+def test_network_snapshot_write_restore_is_unchanged():
+    emulator = HapcanEmulator()
+    devices = [emulator.createDevice(HapcanDevice, nodeId=n, groupId=1, serialNumber=n, aType=0) for n in (1, 2)]
+    before = [contents(d) for d in devices]
+    emulator.snapshot()
+
+    devices[0].nodeId = 9
+    devices[0].description = "changed"
+    devices[1].flash.erase_page(0x1000)
+    devices[1].rawVBus = 1234
+    added = emulator.createDevice(HapcanDevice, nodeId=3, groupId=1, serialNumber=3, aType=0)
+    emulator.removeDevice(devices[1])
+
+    emulator.restore()
+    assert emulator._devices == devices
+    assert added not in emulator._devices
+    assert [contents(d) for d in devices] == before
+    assert devices[0].nodeId == 1
+    assert devices[1].rawVBus == 0
+    assert emulator._byAddress[(2, 1)] == [devices[1]]
+
+
+def test_restore_without_snapshot():
+    with pytest.raises(RuntimeError):
+        HapcanEmulator().restore()